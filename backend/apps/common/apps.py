@@ -3,3 +3,23 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.common"
+
+    def ready(self):
+        from celery.signals import before_task_publish, task_postrun, task_prerun
+        from . import metrics
+        from .lanes import _record_wait, _stamp
+        from .profiling import _propagate, _task_end, _task_start
+
+        # Queue-wait per lane: publishers stamp messages, workers record publish -> start.
+        before_task_publish.connect(_stamp, dispatch_uid="common.lanes.stamp")
+        task_prerun.connect(_record_wait, dispatch_uid="common.lanes.record_wait")
+
+        # SQL queries run by worker tasks, for load runs (LOAD_METRICS=1, see metrics.py),
+        # and opt-in profiling of recommendations/llmcore tasks (see profiling.py).
+        # Both install execute wrappers; receivers run in connection order, so the
+        # metrics wrapper is entered first and left last to keep them nested.
+        task_prerun.connect(metrics._task_start, dispatch_uid="common.metrics.task_start")
+        before_task_publish.connect(_propagate, dispatch_uid="common.profiling.propagate")
+        task_prerun.connect(_task_start, dispatch_uid="common.profiling.task_start")
+        task_postrun.connect(_task_end, dispatch_uid="common.profiling.task_end")
+        task_postrun.connect(metrics._task_end, dispatch_uid="common.metrics.task_end")
@@ -0,0 +1,8 @@
+# apps/common/batching.py
+from typing import Iterator, Sequence
+
+
+def chunks(items: Sequence, size: int) -> Iterator[list]:
+    """Consecutive slices of at most `size` items (batch jobs fan out one task per slice)."""
+    for i in range(0, len(items), size):
+        yield list(items[i:i + size])
@@ -0,0 +1,77 @@
+# apps/common/lanes.py
+"""
+Queue-wait tracking for the Celery priority lanes (CELERY_TASK_ROUTES).
+
+before_task_publish stamps every message with the publish time and its queue;
+task_prerun turns that into a wait (publish -> start) and pushes it onto a
+capped Redis list per lane:
+  lanes:wait:<queue>   newest-first list of waits in ms (LANE_WAIT_SAMPLES kept)
+`GET /api/lanes/` summarises them together with each queue's current depth.
+Best-effort like access tracking: Redis errors never fail a publish or a task.
+"""
+import time
+from typing import Dict, List
+
+import redis
+from django.conf import settings
+
+from .redis_client import Backoff, get_redis
+
+WAIT_PREFIX = "lanes:wait:"
+HEADER_SENT = "published_at"
+HEADER_LANE = "lane"
+
+_backoff = Backoff("lane wait tracking")
+
+
+def _stamp(sender=None, headers=None, routing_key=None, **kwargs):
+    if headers is not None:
+        headers[HEADER_SENT] = time.time()
+        headers[HEADER_LANE] = routing_key or settings.CELERY_TASK_DEFAULT_QUEUE
+
+
+def _record_wait(sender=None, task=None, **kwargs):
+    req = getattr(task, "request", None)
+    sent = getattr(req, HEADER_SENT, None) if req is not None else None
+    if sent is None or getattr(req, "is_eager", False):
+        return
+    if not _backoff.ready():
+        return
+    lane = getattr(req, HEADER_LANE, None) or (req.delivery_info or {}).get("routing_key") or "unknown"
+    wait_ms = max(0.0, (time.time() - float(sent)) * 1000)
+    key = WAIT_PREFIX + lane
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.lpush(key, round(wait_ms, 1))
+        pipe.ltrim(key, 0, settings.LANE_WAIT_SAMPLES - 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        _backoff.trip(e)
+
+
+def _pct(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q / 100.0 * len(values)))]
+
+
+def lane_stats() -> Dict[str, dict]:
+    """Per-lane queue-wait percentiles (ms) over the recent samples, plus queue depth."""
+    lanes = sorted(set(settings.CELERY_LANES) | {settings.CELERY_TASK_DEFAULT_QUEUE})
+    r = get_redis()
+    pipe = r.pipeline(transaction=False)
+    for lane in lanes:
+        pipe.lrange(WAIT_PREFIX + lane, 0, -1)
+        pipe.llen(lane)  # the Redis broker keeps each queue as a list named after it
+    res = pipe.execute()
+
+    out = {}
+    for i, lane in enumerate(lanes):
+        waits = sorted(float(x) for x in res[2 * i])
+        out[lane] = {
+            "depth": res[2 * i + 1],
+            "samples": len(waits),
+            "wait_p50_ms": _pct(waits, 50) if waits else None,
+            "wait_p95_ms": _pct(waits, 95) if waits else None,
+            "wait_p99_ms": _pct(waits, 99) if waits else None,
+            "wait_max_ms": waits[-1] if waits else None,
+        }
+    return out
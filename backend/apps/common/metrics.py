@@ -0,0 +1,106 @@
+# apps/common/metrics.py
+"""
+Process-level request/query counters for load and soak runs (LOAD_METRICS=1).
+
+QueryMetricsMiddleware counts requests, errors and SQL queries per process;
+`GET /api/metrics/` returns this process's counters plus its resident memory.
+With several gunicorn workers each response describes one worker, so clients
+keep the latest snapshot per pid.
+
+Celery workers count the queries of every task they run (task_prerun/postrun)
+into one Redis counter, returned as `worker_queries` (a running total across
+all workers). Eager tasks run inside a request and are already counted there.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import redis
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+
+from .redis_client import get_redis
+
+log = logging.getLogger(__name__)
+
+WORKER_QUERIES_KEY = "metrics:worker_queries"
+
+_lock = threading.Lock()
+_counters = {"requests": 0, "errors": 0, "queries": 0}
+_started = time.time()
+_task = threading.local()
+
+
+def rss_kb(pid: int = None) -> int:
+    try:
+        with open(f"/proc/{pid or os.getpid()}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = self.get_response(request)
+        with _lock:
+            _counters["requests"] += 1
+            _counters["queries"] += queries
+            if response.status_code >= 500:
+                _counters["errors"] += 1
+        return response
+
+
+def _task_start(sender=None, task_id=None, task=None, **kwargs):
+    if not settings.LOAD_METRICS or task is None or getattr(task.request, "is_eager", False):
+        return
+    _task.task_id, _task.queries = task_id, 0
+
+    def count(execute, sql, params, many, context):
+        _task.queries += 1
+        return execute(sql, params, many, context)
+
+    _task.cm = connection.execute_wrapper(count)
+    _task.cm.__enter__()
+
+
+def _task_end(sender=None, task_id=None, **kwargs):
+    if getattr(_task, "task_id", None) != task_id or task_id is None:
+        return
+    _task.cm.__exit__(None, None, None)
+    _task.task_id = _task.cm = None
+    try:
+        get_redis().incrby(WORKER_QUERIES_KEY, _task.queries)
+    except redis.RedisError as e:
+        log.warning("worker query count not recorded: %s", e)
+
+
+def worker_queries() -> Optional[int]:
+    try:
+        return int(get_redis().get(WORKER_QUERIES_KEY) or 0)
+    except redis.RedisError:
+        return None
+
+
+def metrics(request):
+    with _lock:
+        snapshot = dict(_counters)
+    snapshot.update(pid=os.getpid(), rss_kb=rss_kb(), uptime_s=round(time.time() - _started, 1),
+                    worker_queries=worker_queries())
+    return JsonResponse(snapshot)
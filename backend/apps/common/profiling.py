@@ -0,0 +1,201 @@
+# apps/common/profiling.py
+"""
+Opt-in profiling for the recommendations read path and the recommendations /
+llmcore Celery tasks.
+
+A capture records
+  <stem>.prof  cProfile stats (pstats format: `python -m pstats`, snakeviz, ...)
+  <stem>.json  wall time, per-phase breakdown and every SQL query with its timing
+in PROFILE_DIR. What gets captured:
+  PROFILE_ENABLED=1            everything covered
+  PROFILE_SAMPLE_RATE=0.01     a random 1% of requests/tasks
+  X-Profile: <PROFILE_TOKEN>   this request (header ignored while PROFILE_TOKEN is empty)
+Tasks published from inside a captured request are captured too.
+
+Code marks phases with `with phase("generation"): ...`; outside a capture that
+is a no-op. Nested phases are recorded as "outer.inner".
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+log = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+TASK_HEADER = "x_profile"
+SQL_MAX_CHARS = 2000
+
+_local = threading.local()
+
+
+class Capture:
+    def __init__(self, kind: str, name: str, meta: Optional[dict] = None):
+        self.kind = kind
+        self.name = name
+        self.meta = meta or {}
+        self.stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{name.rsplit('.', 1)[-1]}-{uuid.uuid4().hex[:8]}"
+        self.phases: Dict[str, float] = {}
+        self.sql: List[dict] = []
+        self._stack: List[str] = []
+        self._profiler = cProfile.Profile()
+        self._sql_cm = None
+        self._t0 = 0.0
+
+    # Every query run on this thread's connection while the capture is active.
+    def _record_sql(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql.append({
+                "ms": round((time.perf_counter() - t0) * 1000, 3),
+                "phase": ".".join(self._stack) or None,
+                "many": many,
+                "sql": sql[:SQL_MAX_CHARS],
+            })
+
+    def start(self) -> None:
+        self._profiler.enable()  # raises if another profiler is already active on this thread
+        self._t0 = time.perf_counter()
+        self._sql_cm = connection.execute_wrapper(self._record_sql)
+        self._sql_cm.__enter__()
+
+    def stop(self, **extra) -> None:
+        self._profiler.disable()
+        self._sql_cm.__exit__(None, None, None)
+        elapsed = time.perf_counter() - self._t0
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        base = os.path.join(settings.PROFILE_DIR, self.stem)
+        self._profiler.dump_stats(base + ".prof")
+        report = {
+            "kind": self.kind,
+            "name": self.name,
+            **self.meta,
+            **extra,
+            "pid": os.getpid(),
+            "wall_ms": round(elapsed * 1000, 3),
+            "phases_ms": {k: round(v * 1000, 3) for k, v in self.phases.items()},
+            "sql_count": len(self.sql),
+            "sql_ms": round(sum(q["ms"] for q in self.sql), 3),
+            "sql": self.sql,
+        }
+        with open(base + ".json", "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        log.info("profile written %s.{prof,json} wall=%.1fms sql=%s", base, elapsed * 1000, len(self.sql))
+
+
+def current() -> Optional[Capture]:
+    return getattr(_local, "capture", None)
+
+
+@contextmanager
+def phase(name: str):
+    cap = current()
+    if cap is None:
+        yield
+        return
+    cap._stack.append(name)
+    key = ".".join(cap._stack)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        cap.phases[key] = cap.phases.get(key, 0.0) + time.perf_counter() - t0
+        cap._stack.pop()
+
+
+def _sampled() -> bool:
+    rate = settings.PROFILE_SAMPLE_RATE
+    return settings.PROFILE_ENABLED or (rate > 0 and random.random() < rate)
+
+
+def _wanted_by_header(request) -> bool:
+    token = settings.PROFILE_TOKEN
+    return bool(token) and request.headers.get(HEADER) == token
+
+
+def _begin(cap: Capture) -> bool:
+    try:
+        cap.start()
+    except Exception:
+        log.exception("profiling could not start for %s", cap.name)
+        return False
+    _local.capture = cap
+    return True
+
+
+def profiled(name: str):
+    """
+    View decorator (outermost, so DRF dispatch and rendering are included): capture
+    this view when sampled or asked for via the X-Profile header.
+    """
+    def deco(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if current() is not None or not (_wanted_by_header(request) or _sampled()):
+                return view(request, *args, **kwargs)
+            cap = Capture("view", name, {"path": request.get_full_path(), "kwargs": kwargs})
+            if not _begin(cap):
+                return view(request, *args, **kwargs)
+            status = None
+            try:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, "render") and not response.is_rendered:
+                    with phase("serialization"):  # DRF renders JSON after the view returns
+                        response.render()
+                status = response.status_code
+                response[HEADER + "-Id"] = cap.stem
+                return response
+            finally:
+                _local.capture = None
+                try:
+                    cap.stop(status=status)
+                except Exception:  # profiling must never break the request
+                    log.exception("profile write failed for %s", name)
+        return wrapper
+    return deco
+
+
+# ---- Celery ------------------------------------------------------------------
+
+def _covered(task_name: str) -> bool:
+    return any(task_name.startswith(p) for p in settings.PROFILE_TASK_PREFIXES)
+
+
+def _propagate(sender=None, headers=None, **kwargs):
+    # before_task_publish: work enqueued by a captured request/task is captured as well.
+    if headers is not None and current() is not None:
+        headers[TASK_HEADER] = 1
+
+
+def _task_start(sender=None, task_id=None, task=None, args=None, kwargs=None, **_):
+    if task is None or current() is not None or not _covered(task.name):
+        return
+    if not (getattr(task.request, TASK_HEADER, None) or _sampled()):
+        return
+    cap = Capture("task", task.name, {"task_id": task_id, "args": args, "kwargs": kwargs})
+    if _begin(cap):
+        _local.task_id = task_id
+
+
+def _task_end(sender=None, task_id=None, state=None, **_):
+    cap = current()
+    if cap is None or getattr(_local, "task_id", None) != task_id:
+        return
+    _local.capture = None
+    _local.task_id = None
+    try:
+        cap.stop(state=state)
+    except Exception:
+        log.exception("profile write failed for task %s", task_id)
@@ -0,0 +1,61 @@
+# apps/common/redis_client.py
+"""
+The one Redis client used for app-level state: access tracking, lane waits,
+market-cache invalidation, worker query counts, shared rate limits. (Celery and
+the Django cache keep their own connections.)
+
+Everything on it is best-effort, so it fails fast (0.25 s socket timeouts);
+callers on hot paths pair it with a Backoff so an outage costs one timeout per
+BACKOFF_S instead of one per request. Blocking subscribers use pubsub(), whose
+connection has no read timeout.
+"""
+import logging
+import time
+from typing import Optional
+
+import redis
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+TIMEOUT_S = 0.25
+BACKOFF_S = 30.0  # after a Redis error, stop for a while instead of paying timeouts
+
+_client: Optional[redis.Redis] = None
+_blocking: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=TIMEOUT_S, socket_connect_timeout=TIMEOUT_S)
+    return _client
+
+
+def pubsub(**kwargs) -> redis.client.PubSub:
+    """A PubSub for a long-lived listener thread (waits for messages indefinitely)."""
+    global _blocking
+    if _blocking is None:
+        _blocking = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=TIMEOUT_S)
+    return _blocking.pubsub(**kwargs)
+
+
+class Backoff:
+    """
+    Skip a best-effort Redis write for BACKOFF_S after it fails:
+        if backoff.ready():
+            try: ...
+            except redis.RedisError as e: backoff.trip(e)
+    """
+
+    def __init__(self, what: str, seconds: float = BACKOFF_S):
+        self.what = what
+        self.seconds = seconds
+        self._until = 0.0
+
+    def ready(self) -> bool:
+        return time.monotonic() >= self._until
+
+    def trip(self, error: Exception) -> None:
+        self._until = time.monotonic() + self.seconds
+        log.warning("%s paused for %ss: %s", self.what, self.seconds, error)
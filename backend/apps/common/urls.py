@@ -1,7 +1,13 @@
 from django.urls import path
-from .views import health, ping_task
+from django.conf import settings
+from .views import health, lanes, ping_task
 
 urlpatterns = [
     path("health/", health, name="health"),
     path("celery-ping/", ping_task, name="celery_ping"),
+    path("lanes/", lanes, name="lanes"),
 ]
+
+if settings.LOAD_METRICS:
+    from .metrics import metrics
+    urlpatterns.append(path("metrics/", metrics, name="metrics"))
@@ -1,6 +1,9 @@
+import redis
 from django.http import JsonResponse
 from celery import shared_task
 
+from .lanes import lane_stats
+
 def health(request):
     return JsonResponse({"status": "ok", "service": "backend", "version": 1})
 
@@ -11,3 +14,9 @@ def _ping():
 def ping_task(request):
     task = _ping.delay()
     return JsonResponse({"task_id": task.id})
+
+def lanes(request):
+    try:
+        return JsonResponse(lane_stats())
+    except redis.RedisError as e:
+        return JsonResponse({"detail": f"lane stats unavailable: {e}"}, status=503)
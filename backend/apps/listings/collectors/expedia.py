@@ -0,0 +1,241 @@
+# apps/listings/collectors/expedia.py
+"""
+Competitor-rate collector for the configured Expedia GraphQL source (EXPEDIA_* settings).
+
+- one shared httpx.AsyncClient (connection pool) per collection run
+- a global rate limiter: request *starts* are spaced EXPEDIA_RATE_DELAY_S apart
+  across every process sharing REDIS_URL (concurrent collect_expedia runs and
+  workers), but requests overlap, so a 180-day curve costs ~180 x delay instead
+  of 180 x (delay + latency). Without Redis it falls back to spacing per process.
+- responses cached per (region, currency, date) in the Django cache (Redis, so
+  shared by every worker and repeated runs); a cache outage only costs refetches
+- parsed rates streamed into MarketSample in bulk upserts; Expedia has no
+  occupancy, so new rows get a placeholder flagged occupancy_observed=False and
+  existing rows keep theirs
+"""
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.common.redis_client import get_redis
+from apps.listings.models import MarketSample
+from apps.recommendations.market_cache import invalidate_city
+
+log = logging.getLogger(__name__)
+
+DEFAULT_OCCUPANCY = 65.0  # Expedia exposes no occupancy; placeholder for new rows
+FLUSH_EVERY = 50
+RATE_KEY = "expedia:rate:next"
+
+# Reserve the next request slot atomically on the Redis clock; returns the wait in ms.
+_RESERVE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local slot = math.max(now, tonumber(redis.call('GET', KEYS[1]) or '0'))
+redis.call('SET', KEYS[1], slot + tonumber(ARGV[1]), 'PX', tonumber(ARGV[1]) + 60000)
+return slot - now
+"""
+
+
+class RateLimiter:
+    """
+    Spaces request starts at least `delay_s` apart across every caller in the
+    process (any thread, any event loop). Waiting happens outside the lock.
+    """
+
+    def __init__(self, delay_s: float):
+        self.delay_s = max(0.0, float(delay_s))
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    async def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.delay_s
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose slots live in Redis, so the spacing holds across processes.
+    Falls back to this process's own spacing while Redis is unreachable.
+    """
+
+    async def wait(self) -> None:
+        try:
+            wait_ms = await sync_to_async(self._reserve, thread_sensitive=False)()
+        except redis.RedisError as e:
+            log.warning("expedia shared rate limit unavailable, limiting per process: %s", e)
+            await super().wait()
+            return
+        if wait_ms > 0:
+            await asyncio.sleep(wait_ms / 1000.0)
+
+    def _reserve(self) -> int:
+        return int(get_redis().eval(_RESERVE, 1, RATE_KEY, int(self.delay_s * 1000)))
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_limiter() -> RateLimiter:
+    global _limiter
+    delay = float(settings.EXPEDIA_RATE_DELAY_S)
+    if _limiter is None or _limiter.delay_s != delay:
+        _limiter = SharedRateLimiter(delay)
+    return _limiter
+
+
+def _payload(region_id: str, d: date) -> list:
+    out = d + timedelta(days=1)
+    return [{
+        "operationName": "LodgingPwaPropertySearch",
+        "variables": {
+            "context": {
+                "siteId": settings.EXPEDIA_SITE_ID,
+                "locale": settings.EXPEDIA_LOCALE,
+                "currency": settings.EXPEDIA_CURRENCY,
+            },
+            "criteria": {
+                "primary": {
+                    "dateRange": {
+                        "checkInDate": {"day": d.day, "month": d.month, "year": d.year},
+                        "checkOutDate": {"day": out.day, "month": out.month, "year": out.year},
+                    },
+                    "destination": {
+                        "regionId": str(region_id),
+                        "coordinates": {
+                            "latitude": float(settings.EXPEDIA_LAT),
+                            "longitude": float(settings.EXPEDIA_LON),
+                        },
+                    },
+                    "rooms": [{"adults": 2, "children": []}],
+                },
+            },
+        },
+        "extensions": {"persistedQuery": {"version": 1, "sha256Hash": settings.EXPEDIA_PERSISTED_HASH}},
+    }]
+
+
+def _headers() -> Dict[str, str]:
+    headers = {
+        "content-type": "application/json",
+        "client-info": settings.EXPEDIA_CLIENT_INFO,
+        "user-agent": settings.EXPEDIA_UA,
+    }
+    if settings.EXPEDIA_COOKIE:
+        headers["cookie"] = settings.EXPEDIA_COOKIE
+    return headers
+
+
+def extract_prices(payload) -> List[float]:
+    """Every `lead.amount` in the response (one per property card)."""
+    prices: List[float] = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            lead = node.get("lead")
+            if isinstance(lead, dict) and isinstance(lead.get("amount"), (int, float)) and lead["amount"] > 0:
+                prices.append(float(lead["amount"]))
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return prices
+
+
+async def _fetch_day(client: httpx.AsyncClient, limiter: RateLimiter, region_id: str, d: date) -> Optional[dict]:
+    key = f"expedia:{region_id}:{settings.EXPEDIA_CURRENCY}:{d.isoformat()}"
+    try:
+        hit = await sync_to_async(cache.get)(key)
+    except redis.RedisError as e:
+        log.warning("expedia cache unavailable, fetching dt=%s: %s", d, e)
+        hit = None
+    if hit is not None:
+        return hit
+
+    await limiter.wait()
+    try:
+        rsp = await client.post(settings.EXPEDIA_GRAPHQL_URL, json=_payload(region_id, d), headers=_headers())
+        rsp.raise_for_status()
+        prices = extract_prices(rsp.json())
+    except (httpx.HTTPError, ValueError) as e:
+        log.warning("expedia fetch failed region=%s dt=%s: %s", region_id, d, e)
+        return None
+    if not prices:
+        log.info("expedia returned no prices region=%s dt=%s", region_id, d)
+        return None
+
+    rate = {"dt": d.isoformat(), "price": round(statistics.median(prices), 2), "n_listings": len(prices)}
+    try:
+        await sync_to_async(cache.set)(key, rate, settings.EXPEDIA_CACHE_S)
+    except redis.RedisError as e:
+        log.warning("expedia cache write failed dt=%s: %s", d, e)
+    return rate
+
+
+def _upsert(city: str, rates: List[dict]) -> int:
+    if not rates:
+        return 0
+    MarketSample.objects.bulk_create(
+        [
+            MarketSample(city=city, dt=date.fromisoformat(r["dt"]), price=r["price"],
+                         occupancy=DEFAULT_OCCUPANCY, occupancy_observed=False, n_listings=r["n_listings"])
+            for r in rates
+        ],
+        update_conflicts=True,
+        unique_fields=["city", "dt"],
+        update_fields=["price", "n_listings"],
+        batch_size=500,
+    )
+    invalidate_city(city)
+    return len(rates)
+
+
+async def collect_city_async(city: str, region_id: str, dates: Iterable[date]) -> Dict[str, int]:
+    limiter = get_limiter()
+    limits = httpx.Limits(
+        max_connections=settings.EXPEDIA_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.EXPEDIA_MAX_CONNECTIONS,
+    )
+    stats = {"requested": 0, "written": 0, "failed": 0}
+    buf: List[dict] = []
+    upsert = sync_to_async(_upsert)
+
+    async with httpx.AsyncClient(limits=limits, timeout=settings.EXPEDIA_TIMEOUT_S) as client:
+        tasks = [asyncio.create_task(_fetch_day(client, limiter, region_id, d)) for d in dates]
+        stats["requested"] = len(tasks)
+        for fut in asyncio.as_completed(tasks):
+            rate = await fut
+            if rate is None:
+                stats["failed"] += 1
+                continue
+            buf.append(rate)
+            if len(buf) >= FLUSH_EVERY:
+                stats["written"] += await upsert(city, buf)
+                buf = []
+    stats["written"] += await upsert(city, buf)
+    return stats
+
+
+def collect_city(city: str, region_id: Optional[str] = None, days: int = 180,
+                 start: Optional[date] = None) -> Dict[str, int]:
+    """Pull `days` nightly rates from `start` (default today) into MarketSample for `city`."""
+    start = start or date.today()
+    dates = [start + timedelta(days=i) for i in range(max(1, int(days)))]
+    t0 = time.perf_counter()
+    stats = asyncio.run(collect_city_async(city, region_id or settings.EXPEDIA_REGION_ID, dates))
+    log.info("expedia collect city=%s days=%s %s in %.2fs", city, len(dates), stats, time.perf_counter() - t0)
+    return stats
@@ -0,0 +1,71 @@
+# apps/listings/collectors/standin.py
+"""
+Local stand-in for the Expedia GraphQL endpoint, for tests and load runs.
+
+Answers any POST with a deterministic set of property cards whose
+`priceSection.priceSummary.price.lead.amount` depends on the requested
+check-in date (weekends dearer), optionally after an artificial latency.
+
+    server, url = start_standin()            # background thread, random port
+    settings.EXPEDIA_GRAPHQL_URL = url
+    ...
+    server.shutdown()
+"""
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+def fake_response(check_in: date, n_properties: int = 12) -> dict:
+    base = 3000 + (check_in.toordinal() % 17) * 40
+    if check_in.weekday() in (4, 5):
+        base *= 1.15
+    cards = [
+        {
+            "__typename": "LodgingCard",
+            "id": str(100000 + i),
+            "priceSection": {"priceSummary": {"price": {"lead": {
+                "amount": round(base * (0.8 + 0.4 * i / max(1, n_properties - 1)), 2),
+                "currencyInfo": {"code": "INR"},
+            }}}},
+        }
+        for i in range(n_properties)
+    ]
+    return {"data": {"propertySearch": {"propertySearchListings": cards}}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    latency_s = 0.0
+    requests_seen = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("content-length") or 0))
+        try:
+            req = json.loads(body)
+            ci = req[0]["variables"]["criteria"]["primary"]["dateRange"]["checkInDate"]
+            check_in = date(ci["year"], ci["month"], ci["day"])
+        except (ValueError, KeyError, IndexError, TypeError):
+            self.send_error(400, "bad query")
+            return
+        type(self).requests_seen += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        data = json.dumps(fake_response(check_in)).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_standin(host: str = "127.0.0.1", port: int = 0, latency_s: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    handler = type("StandinHandler", (_Handler,), {"latency_s": latency_s, "requests_seen": 0})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="expedia-standin", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/graphql"
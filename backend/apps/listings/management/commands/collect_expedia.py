@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from apps.listings.collectors.expedia import collect_city
+
+
+class Command(BaseCommand):
+    help = (
+        "Collect nightly competitor rates from the configured Expedia source into MarketSample. "
+        "Request starts are spaced EXPEDIA_RATE_DELAY_S apart across all processes sharing REDIS_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--city", required=True, help="MarketSample city name to write")
+        parser.add_argument("--region-id", default=None, help="Expedia region id (default: EXPEDIA_REGION_ID)")
+        parser.add_argument("--days", type=int, default=180)
+        parser.add_argument("--from", dest="start", help="First check-in date YYYY-MM-DD (default: today)")
+        parser.add_argument("--standin", action="store_true",
+                            help="Serve a local stand-in endpoint and collect from it (no network)")
+        parser.add_argument("--standin-latency", type=float, default=0.2)
+
+    def handle(self, *args, **opts):
+        server = None
+        if opts["standin"]:
+            from apps.listings.collectors.standin import start_standin
+            server, settings.EXPEDIA_GRAPHQL_URL = start_standin(latency_s=opts["standin_latency"])
+            self.stdout.write(f"Stand-in Expedia endpoint at {settings.EXPEDIA_GRAPHQL_URL}")
+        try:
+            stats = collect_city(
+                opts["city"],
+                region_id=opts["region_id"],
+                days=opts["days"],
+                start=parse_date(opts["start"]) if opts["start"] else None,
+            )
+        finally:
+            if server is not None:
+                server.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f"{opts['city']}: requested={stats['requested']} written={stats['written']} failed={stats['failed']}"
+        ))
@@ -5,6 +5,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from apps.listings.models import Listing, Calendar, MarketSample, FeaturesDaily
+from apps.recommendations.market_cache import invalidate_city
 
 CITIES = ["Bengaluru", "Mumbai", "Pune", "Delhi", "Hyderabad", "Chennai", "Goa"]
 N_LISTINGS = 20
@@ -59,5 +60,6 @@ class Command(BaseCommand):
                     ft_bulk.append(FeaturesDaily(city=city, dt=d, is_holiday=is_holiday, event_score=event_score))
             MarketSample.objects.bulk_create(ms_bulk, batch_size=2000)
             FeaturesDaily.objects.bulk_create(ft_bulk, batch_size=2000)
+            invalidate_city()  # bulk_create/delete send no signals
 
         self.stdout.write(self.style.SUCCESS("Seeded demo data."))
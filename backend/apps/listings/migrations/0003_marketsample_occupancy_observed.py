@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_featuresdaily_avg_temp_featuresdaily_holiday_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketsample',
+            name='occupancy_observed',
+            field=models.BooleanField(default=True),
+        ),
+    ]
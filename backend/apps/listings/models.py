@@ -30,6 +30,9 @@ class MarketSample(models.Model):
     price = models.DecimalField(max_digits=8, decimal_places=2)      # average nightly rate
     occupancy = models.DecimalField(max_digits=5, decimal_places=2)  # 0..100 percentage
     n_listings = models.PositiveIntegerField(default=0)
+    # False when occupancy is a placeholder (rate-only sources such as the Expedia
+    # collector); history loaders skip those rows.
+    occupancy_observed = models.BooleanField(default=True)
 
     class Meta:
         unique_together = ("city", "dt")
@@ -3,3 +3,14 @@ from django.apps import AppConfig
 class LlmCoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.llmcore"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from apps.listings.models import Listing
+        from apps.recommendations.models import Recommendation
+        from .comps import _mark_listing, _mark_recommendation
+
+        # Keep this worker's comps index current; bulk writers call comps.mark_dirty themselves.
+        post_save.connect(_mark_listing, sender=Listing, dispatch_uid="llmcore.comps.listing_save")
+        post_delete.connect(_mark_listing, sender=Listing, dispatch_uid="llmcore.comps.listing_delete")
+        post_save.connect(_mark_recommendation, sender=Recommendation, dispatch_uid="llmcore.comps.rec_save")
@@ -0,0 +1,212 @@
+# apps/llmcore/comps.py
+"""
+In-memory "top-k comps" index feeding the LLM prompt.
+
+Each listing is a row of parallel NumPy arrays (city code, rooms, recent
+recommendation level). Comps are the nearest listings in the same city by
+scaled (rooms, log level) distance; batch queries are answered per city with
+one broadcasted distance matrix.
+
+One index per worker process (get_index()). Listing/Recommendation saves mark
+rows dirty through signals, and bulk writers (which send none) call mark_dirty()
+themselves; dirty rows are applied on the next query. A full re-read (two
+queries) happens every COMPS_REFRESH_S so writes from other processes show up too.
+"""
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg
+
+from apps.listings.models import Listing
+from apps.recommendations.models import Recommendation
+
+log = logging.getLogger(__name__)
+
+LEVEL_WINDOW_DAYS = 30  # recent level = mean rec_price over today +/- this many days
+ROOMS_SCALE = 1.0       # one room apart ...
+LEVEL_SCALE = 0.10      # ... weighs like a 10% price-level gap
+
+
+class CompsIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.row: Dict[str, int] = {}
+        self.city_codes: Dict[str, int] = {}
+        self.city = np.zeros(0, dtype=np.int32)
+        self.rooms = np.zeros(0, dtype=np.float64)
+        self.level = np.zeros(0, dtype=np.float64)  # NaN = no recent recommendations
+        self.alive = np.zeros(0, dtype=bool)
+        self._dirty: Set[str] = set()
+        self._built_at: Optional[float] = None
+
+    # ---- maintenance -----------------------------------------------------
+
+    def mark_dirty(self, listing_id) -> None:
+        with self._lock:
+            self._dirty.add(str(listing_id))
+
+    def _levels(self, listing_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        today = date.today()
+        qs = Recommendation.objects.filter(
+            dt__range=(today - timedelta(days=LEVEL_WINDOW_DAYS), today + timedelta(days=LEVEL_WINDOW_DAYS))
+        )
+        if listing_ids is not None:
+            qs = qs.filter(listing_id__in=list(listing_ids))
+        return {
+            str(r["listing_id"]): float(r["level"])
+            for r in qs.values("listing_id").annotate(level=Avg("rec_price"))
+        }
+
+    def _city_code(self, city: str) -> int:
+        return self.city_codes.setdefault(city, len(self.city_codes))
+
+    def rebuild(self) -> None:
+        # Clear before reading: the reads cover earlier marks, later ones stay dirty.
+        with self._lock:
+            self._dirty.clear()
+        rows = list(Listing.objects.values_list("id", "title", "city", "rooms"))
+        levels = self._levels()
+        with self._lock:
+            self.ids = [str(r[0]) for r in rows]
+            self.titles = [r[1] for r in rows]
+            self.row = {lid: i for i, lid in enumerate(self.ids)}
+            self.city = np.array([self._city_code(r[2]) for r in rows], dtype=np.int32)
+            self.rooms = np.array([r[3] or 1 for r in rows], dtype=np.float64)
+            self.level = np.array([levels.get(lid, np.nan) for lid in self.ids], dtype=np.float64)
+            self.alive = np.ones(len(rows), dtype=bool)
+            self._built_at = time.monotonic()
+
+    def _apply_dirty(self) -> None:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        rows = {str(r[0]): r for r in Listing.objects.filter(id__in=list(dirty)).values_list("id", "title", "city", "rooms")}
+        levels = self._levels(dirty)
+        with self._lock:
+            new = [lid for lid in dirty if lid in rows and lid not in self.row]
+            if new:
+                n0 = len(self.ids)
+                self.ids.extend(new)
+                self.titles.extend(rows[lid][1] for lid in new)
+                self.row.update({lid: n0 + i for i, lid in enumerate(new)})
+                self.city = np.concatenate([self.city, np.zeros(len(new), dtype=np.int32)])
+                self.rooms = np.concatenate([self.rooms, np.ones(len(new))])
+                self.level = np.concatenate([self.level, np.full(len(new), np.nan)])
+                self.alive = np.concatenate([self.alive, np.ones(len(new), dtype=bool)])
+            for lid in dirty:
+                i = self.row.get(lid)
+                if i is None:
+                    continue
+                if lid not in rows:  # deleted: tombstone until the next full rebuild
+                    self.alive[i] = False
+                    continue
+                _, title, city, rooms = rows[lid]
+                self.titles[i] = title
+                self.city[i] = self._city_code(city)
+                self.rooms[i] = rooms or 1
+                self.level[i] = levels.get(lid, np.nan)
+
+    def ensure_fresh(self) -> None:
+        if self._built_at is None or time.monotonic() - self._built_at > settings.COMPS_REFRESH_S:
+            self.rebuild()
+        else:
+            self._apply_dirty()
+
+    # ---- queries ---------------------------------------------------------
+
+    def query(self, listing_ids: Iterable, k: int = 5) -> Dict[str, List[dict]]:
+        """
+        Top-k comps for each listing id: [{"listing_id", "title", "rooms", "level"}, ...]
+        nearest first. Unknown ids map to [].
+        """
+        self.ensure_fresh()
+        wanted = [str(x) for x in listing_ids]
+        out: Dict[str, List[dict]] = {lid: [] for lid in wanted}
+        q_rows = np.array([self.row[lid] for lid in wanted if lid in self.row], dtype=np.int64)
+        q_rows = q_rows[self.alive[q_rows]]
+        if not len(q_rows) or k <= 0:
+            return out
+
+        # Missing levels sit at the city median so rooms alone decides for them.
+        log_level = np.log(self.level)
+        for code in np.unique(self.city[q_rows]):
+            members = np.nonzero((self.city == code) & self.alive)[0]
+            qs = q_rows[self.city[q_rows] == code]
+            lv = log_level[members]
+            fill = np.nanmedian(lv) if np.isfinite(lv).any() else 0.0
+            feats = np.column_stack([
+                self.rooms[members] / ROOMS_SCALE,
+                np.where(np.isfinite(lv), lv, fill) / LEVEL_SCALE,
+            ])
+            pos = np.searchsorted(members, qs)  # queries are members of their own city
+            d2 = ((feats[pos][:, None, :] - feats[None, :, :]) ** 2).sum(-1)
+            d2[np.arange(len(qs)), pos] = np.inf  # never your own comp
+            kk = min(k, len(members) - 1)
+            if kk <= 0:
+                continue
+            nearest = np.argpartition(d2, kk - 1, axis=1)[:, :kk]
+            order = np.take_along_axis(d2, nearest, axis=1).argsort(axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            for qi, q in enumerate(qs):
+                out[self.ids[q]] = [
+                    {
+                        "listing_id": self.ids[members[j]],
+                        "title": self.titles[members[j]],
+                        "rooms": int(self.rooms[members[j]]),
+                        "level": None if np.isnan(self.level[members[j]]) else round(float(self.level[members[j]]), 2),
+                    }
+                    for j in nearest[qi]
+                ]
+        return out
+
+
+_index: Optional[CompsIndex] = None
+
+
+def get_index() -> CompsIndex:
+    global _index
+    if _index is None:
+        _index = CompsIndex()
+    return _index
+
+
+def format_comps(comps: List[dict]) -> str:
+    if not comps:
+        return "none"
+    return "; ".join(
+        f"{c['title']} (rooms={c['rooms']}, avg={c['level']:.0f} INR)" if c["level"] is not None
+        else f"{c['title']} (rooms={c['rooms']})"
+        for c in comps
+    )
+
+
+def mark_dirty(listing_ids: Iterable) -> None:
+    """For bulk Recommendation/Listing writes: refresh these listings once the transaction commits."""
+    if _index is None:
+        return
+    ids = {str(lid) for lid in listing_ids}
+
+    def _do():
+        for lid in ids:
+            _index.mark_dirty(lid)
+
+    transaction.on_commit(_do)
+
+
+def _mark_listing(sender, instance, **kwargs):
+    if _index is not None:
+        _index.mark_dirty(instance.id)
+
+
+def _mark_recommendation(sender, instance, **kwargs):
+    if _index is not None:
+        _index.mark_dirty(instance.listing_id)
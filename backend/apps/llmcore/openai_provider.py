@@ -0,0 +1,52 @@
+# apps/llmcore/openai_provider.py
+"""
+OpenAI chat-completions provider (registered as "openai" in providers.py).
+This is the only module that imports the openai SDK.
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+from openai import APITimeoutError, OpenAI
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_clients: Dict[tuple, OpenAI] = {}
+_lock = threading.Lock()
+
+
+class LLMTimeout(TimeoutError):
+    pass
+
+
+def _client(timeout: Optional[float], max_retries: Optional[int]) -> OpenAI:
+    # One client (and connection pool) per (timeout, retries), shared across threads.
+    with _lock:
+        client = _clients.get((timeout, max_retries))
+        if client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY is not set")
+            if timeout is None:
+                client = OpenAI(api_key=api_key)
+            else:
+                # Bounded calls: no silent retries unless asked, each HTTP attempt gives up at the deadline.
+                client = OpenAI(api_key=api_key, timeout=timeout, max_retries=max_retries or 0)
+            _clients[(timeout, max_retries)] = client
+        return client
+
+
+def complete(user: str, system: Optional[str] = None, timeout: Optional[float] = None,
+             model: Optional[str] = None, max_retries: Optional[int] = None) -> str:
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": user})
+    try:
+        rsp = _client(timeout, max_retries).chat.completions.create(
+            model=model or DEFAULT_MODEL,
+            messages=messages,
+            temperature=0.2,
+            response_format={"type": "json_object"},
+        )
+    except APITimeoutError as e:
+        raise LLMTimeout(str(e)) from e
+    return rsp.choices[0].message.content
@@ -1,11 +1,21 @@
 # apps/llmcore/price.py
-import os, json, logging
+import json, logging, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
 from django.db import transaction
-from openai import OpenAI
+from django.db.models import Q
 
-from apps.listings.models import Listing, FeaturesDaily
+from apps.listings.models import Calendar, Listing, FeaturesDaily
+from apps.recommendations.market_cache import market_window
 from apps.recommendations.models import Recommendation
+from apps.recommendations.pricing import adjust_market_curve, baseline_price_vec, load_params
+from apps.recommendations.tasks import baseline_window, blocked_days
+from .comps import format_comps, get_index, mark_dirty
+from .providers import get_provider
 
 log = logging.getLogger(__name__)
 
@@ -24,28 +34,41 @@ def _features(city: str, d: date):
     ).first()
     return f or {"event_score": 0.0, "is_holiday": False}
 
-def _prompt(city: str, d_iso: str, feats: dict) -> str:
+def _comps_line(listing_id: str) -> str:
+    k = settings.COMPS_K
+    comps = get_index().query([listing_id], k).get(str(listing_id), [])
+    return f"Top {k} comps (same city): {format_comps(comps)}\n"
+
+def _prompt(city: str, d_iso: str, feats: dict, comps: str = "") -> str:
     return (
         "You are an expert hotel/Airbnb pricing analyst.\n"
         f"City: {city}\n"
         f"Date: {d_iso}\n"
         f"Signals: event_score={feats['event_score']}, is_holiday={feats['is_holiday']}\n"
+        f"{comps}"
         "Return STRICT JSON object with keys: price, low, high, reason. "
         "Numbers should be floats in INR."
     )
 
-def _call_openai(prompt: str) -> dict:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set")
-    client = OpenAI(api_key=api_key)
-    rsp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
-        response_format={"type": "json_object"},
-    )
-    return json.loads(rsp.choices[0].message.content)
+def _call_openai(prompt: str, timeout: Optional[float] = None, max_retries: Optional[int] = None) -> dict:
+    # Name kept for callers; the provider comes from LLM_PROVIDER (see providers.py).
+    return json.loads(get_provider()(prompt, timeout=timeout, max_retries=max_retries))
+
+def _parse_quote(data: dict, strict: bool = True) -> Tuple[float, float, float, str]:
+    """
+    Defensive casting (LLMs sometimes return strings). Raises ValueError on
+    missing/non-numeric prices and, when `strict` (hybrid/city modes, which have
+    a baseline to fall back to), on an inconsistent band.
+    """
+    try:
+        price = float(data.get("price") or data.get("rec_price"))
+        low   = float(data.get("low")   or data.get("conf_low")  or price * 0.9)
+        high  = float(data.get("high")  or data.get("conf_high") or price * 1.1)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"bad LLM quote {data!r}") from e
+    if strict and not (0 < low <= price <= high):
+        raise ValueError(f"inconsistent LLM quote {data!r}")
+    return price, low, high, data.get("reason", "LLM generated")
 
 def _write_row(listing_id, d: date, price: float, low: float, high: float, reason: str):
     Recommendation.objects.update_or_create(
@@ -61,7 +84,7 @@ def _write_row(listing_id, d: date, price: float, low: float, high: float, reaso
 
 def generate_llm_prices_range(listing_id: str, start: str, end: str):
     """
-    Generate and upsert LLM prices for [start, end] inclusive.
+    Generate and upsert LLM prices for [start, end] inclusive. Blocked days are skipped.
     """
     listing = Listing.objects.get(id=listing_id)
     d0 = datetime.strptime(start, "%Y-%m-%d").date()
@@ -69,18 +92,16 @@ def generate_llm_prices_range(listing_id: str, start: str, end: str):
     if d1 < d0:
         d0, d1 = d1, d0
 
+    comps = _comps_line(listing_id)
+    blocked = blocked_days(listing_id, d0, d1)
     rows = 0
     with transaction.atomic():
         for d in _daterange(d0, d1):
+            if d in blocked:
+                continue
             feats = _features(listing.city, d)
-            data = _call_openai(_prompt(listing.city, d.isoformat(), feats))
-
-            # Defensive casting (LLMs sometimes return strings)
-            price = float(data.get("price") or data.get("rec_price"))
-            low   = float(data.get("low")   or data.get("conf_low")  or price * 0.9)
-            high  = float(data.get("high")  or data.get("conf_high") or price * 1.1)
-            reason = data.get("reason", "LLM generated")
-
+            data = _call_openai(_prompt(listing.city, d.isoformat(), feats, comps))
+            price, low, high, reason = _parse_quote(data, strict=False)
             _write_row(listing_id, d, price, low, high, reason)
             rows += 1
 
@@ -96,3 +117,291 @@ def generate_llm_prices(listing_id: str, days_ahead: int = 7):
     today = date.today()
     end = today + timedelta(days=max(0, int(days_ahead) - 1))
     return generate_llm_prices_range(listing_id, today.isoformat(), end.isoformat())
+
+def _timed_call(prompt: str, timeout: float, started: Dict, key) -> dict:
+    started[key] = time.monotonic()
+    return _call_openai(prompt, timeout=timeout)
+
+def generate_hybrid_prices_range(listing_id: str, start: str, end: str,
+                                 deadline_s: Optional[float] = None,
+                                 hedge_after_s: Optional[float] = None,
+                                 budget_s: Optional[float] = None) -> Dict[str, int]:
+    """
+    LLM prices for [start, end] inclusive with bounded latency.
+
+    Up to LLM_CONCURRENCY unanswered days are asked at once. A call still running
+    after `hedge_after_s` gets one duplicate ("hedge"), started immediately; the
+    first valid answer wins. Each HTTP call
+    gives up at `deadline_s`, and the whole range waits at most `budget_s`.
+    Days whose calls time out, fail or return invalid JSON get the vectorized
+    baseline price, flagged in the reason. Blocked days are neither asked nor written.
+    """
+    deadline_s = float(deadline_s or settings.LLM_DEADLINE_S)
+    hedge_after_s = float(hedge_after_s or settings.LLM_HEDGE_AFTER_S)
+    budget_s = float(budget_s or settings.LLM_RANGE_BUDGET_S)
+
+    listing = Listing.objects.get(id=listing_id)
+    d0 = datetime.strptime(start, "%Y-%m-%d").date()
+    d1 = datetime.strptime(end, "%Y-%m-%d").date()
+    if d1 < d0:
+        d0, d1 = d1, d0
+
+    # Baseline first: it is cheap and is what every missed day falls back to.
+    baseline, _ = baseline_window(listing, d0, d1)
+    mw = market_window(listing.city, d0, d1)  # cached by baseline_window above
+    blocked = blocked_days(listing_id, d0, d1)
+    comps = _comps_line(listing_id)
+    prompts = {
+        d: _prompt(
+            listing.city, d.isoformat(),
+            {"event_score": float(mw["event_score"][i]), "is_holiday": bool(mw["is_holiday"][i])},
+            comps,
+        )
+        for i, (d, _, _) in enumerate(baseline)
+        if d not in blocked
+    }
+
+    t0 = time.monotonic()
+    quotes: Dict[date, Tuple[float, float, float, str]] = {}
+    failures: Dict[date, str] = {}
+    started: Dict = {}
+    inflight: Dict = {}   # future -> (day, attempt)
+    attempts: Dict[date, int] = {}
+
+    # LLM_CONCURRENCY caps the days being asked, not threads: a day stops counting once
+    # answered, even while its slow first attempt is still running, so queued days start
+    # as soon as hedges land. Threads (<= 2 per day) are never the bottleneck, so a
+    # hedge never waits behind first attempts.
+    todo = list(prompts)
+    pool = ThreadPoolExecutor(max_workers=max(1, 2 * len(todo)), thread_name_prefix="llm-hybrid")
+
+    def launch():
+        asking = {d for d, _ in inflight.values()}
+        while todo and len(asking) < settings.LLM_CONCURRENCY:
+            d = todo.pop(0)
+            inflight[pool.submit(_timed_call, prompts[d], deadline_s, started, (d, 0))] = (d, 0)
+            attempts[d] = 1
+            asking.add(d)
+
+    try:
+        launch()
+        while inflight:
+            now = time.monotonic()
+            remaining = budget_s - (now - t0)
+            if remaining <= 0:
+                break
+            # Wake up for the earliest pending hedge, or the budget, whichever is first.
+            next_hedge = min(
+                (started[(d, a)] + hedge_after_s - now
+                 for d, a in inflight.values() if a == 0 and attempts[d] == 1 and (d, 0) in started),
+                default=remaining,
+            )
+            done, _ = wait(list(inflight), timeout=max(0.01, min(remaining, next_hedge)), return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                d, attempt = inflight.pop(fut)
+                if d in quotes:
+                    continue
+                try:
+                    quotes[d] = _parse_quote(fut.result())
+                    failures.pop(d, None)
+                except TimeoutError as e:
+                    failures[d] = "llm timeout"
+                    log.info("hybrid LLM call timed out listing=%s dt=%s attempt=%s: %s", listing_id, d, attempt, e)
+                except Exception as e:  # API error, bad JSON or bad numbers
+                    failures[d] = "llm invalid" if isinstance(e, ValueError) else "llm error"
+                    log.info("hybrid LLM call failed listing=%s dt=%s attempt=%s: %s", listing_id, d, attempt, e)
+
+            # Drop duplicates of answered days; hedge slow first attempts.
+            now = time.monotonic()
+            for fut, (d, attempt) in list(inflight.items()):
+                if d in quotes:
+                    fut.cancel()
+                    inflight.pop(fut)
+                elif (attempt == 0 and attempts[d] == 1 and (d, 0) in started
+                      and now - started[(d, 0)] >= hedge_after_s):
+                    inflight[pool.submit(_timed_call, prompts[d], deadline_s, started, (d, 1))] = (d, 1)
+                    attempts[d] = 2
+            launch()
+    finally:
+        # Don't wait for stragglers: their HTTP timeout ends them, the results are ignored.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    stats = {"llm": 0, "fallback_timeout": 0, "fallback_invalid": 0, "fallback_error": 0}
+    with transaction.atomic():
+        for d, b_price, b_reason in baseline:
+            if d in blocked:
+                continue
+            if d in quotes:
+                price, low, high, reason = quotes[d]
+                stats["llm"] += 1
+            else:
+                why = failures.get(d, "llm timeout")
+                stats["fallback_" + why.split()[-1]] += 1
+                price, low, high = b_price, b_price * 0.9, b_price * 1.1
+                reason = f"{b_reason} [fallback: {why}]"
+            _write_row(listing_id, d, round(price, 2), round(low, 2), round(high, 2), reason)
+
+    log.info(
+        "hybrid range write complete listing=%s start=%s end=%s elapsed=%.2fs %s",
+        listing_id, d0, d1, time.monotonic() - t0, stats,
+    )
+    return stats
+
+# ---------------------------------------------------------------------------
+# City-level mode: one LLM call per city per chunk of days, fanned out to listings.
+
+# Curve values must stay within this multiple of the day's market price (the
+# USER_TEMPLATE rule); anything outside is treated as invalid and falls back.
+CURVE_BAND = (0.5, 2.0)
+
+def _city_prompt(city: str, rows: List[dict]) -> str:
+    lines = "\n".join(
+        f"- {r['dt'].isoformat()} {r['dt'].strftime('%a')}: event_score={r['event_score']}, "
+        f"is_holiday={r['is_holiday']}, market_price={r['ms_price']:.0f}, occupancy={r['occ']:.0f}%"
+        for r in rows
+    )
+    return (
+        "You are an expert hotel/Airbnb pricing analyst.\n"
+        f"City: {city}\n"
+        "Estimate the typical market nightly rate (a standard 1-room listing) for each date:\n"
+        f"{lines}\n"
+        f"Keep each price within {CURVE_BAND[0]}x..{CURVE_BAND[1]}x of that date's market_price.\n"
+        'Return STRICT JSON object {"days": [{"dt": "YYYY-MM-DD", "price": 0, "low": 0, "high": 0, "reason": ""}]} '
+        "with exactly one entry per date. Numbers should be floats in INR."
+    )
+
+def _city_signals(city: str, d0: date, d1: date) -> List[dict]:
+    mw = market_window(city, d0, d1)
+    return [
+        {"dt": d, "ms_price": float(mw["ms_price"][i]), "occ": float(mw["occ"][i]),
+         "event_score": float(mw["event_score"][i]), "is_holiday": bool(mw["is_holiday"][i])}
+        for i, d in enumerate(_daterange(d0, d1))
+    ]
+
+def _city_curve_chunk(city: str, rows: List[dict]) -> Dict[date, Tuple[float, float, float, str]]:
+    """
+    Parsed {day: quote} for one chunk; days missing or invalid in the answer
+    (including prices outside CURVE_BAND x market) are left out.
+    """
+    # A whole chunk of days per answer: its own (longer) deadline, with retries.
+    data = _call_openai(_city_prompt(city, rows), timeout=settings.LLM_CITY_DEADLINE_S,
+                        max_retries=settings.LLM_CITY_RETRIES)
+    market = {r["dt"]: r["ms_price"] for r in rows}
+    lo, hi = CURVE_BAND
+    out = {}
+    for item in data.get("days") or []:
+        try:
+            d = date.fromisoformat(str(item.get("dt")))
+            if d not in market:
+                continue
+            quote = _parse_quote(item)
+        except ValueError:
+            continue
+        if lo * market[d] <= quote[0] <= hi * market[d]:
+            out[d] = quote
+        else:
+            log.info("city LLM curve off market city=%s dt=%s price=%.0f market=%.0f", city, d, quote[0], market[d])
+    return out
+
+def generate_city_llm_prices(days_ahead: int = 7, cities: Optional[List[str]] = None,
+                             chunk_days: Optional[int] = None) -> Dict[str, int]:
+    """
+    Market-level LLM curve per city for today -> today+days_ahead-1, in chunks of
+    `chunk_days` (all chunks of all cities run concurrently), then each listing's
+    price = curve adjusted for its rooms and the day's occupancy with the city's
+    tuned baseline params. Days the LLM skips use the baseline's market, weekend
+    and event terms as the curve, flagged in the reason. Blocked listing-days get no row.
+    """
+    chunk_days = max(1, int(chunk_days or settings.LLM_CITY_CHUNK_DAYS))
+    d0 = date.today()
+    d1 = d0 + timedelta(days=max(1, int(days_ahead)) - 1)
+    if cities is None:
+        cities = list(Listing.objects.values_list("city", flat=True).distinct())
+
+    signals = {city: _city_signals(city, d0, d1) for city in cities}
+    curves: Dict[str, Dict[date, Tuple[float, float, float, str]]] = {city: {} for city in cities}
+    failed_chunks = 0
+    with ThreadPoolExecutor(max_workers=settings.LLM_CONCURRENCY, thread_name_prefix="llm-city") as pool:
+        futures = {
+            pool.submit(_city_curve_chunk, city, rows[i:i + chunk_days]): city
+            for city, rows in signals.items()
+            for i in range(0, len(rows), chunk_days)
+        }
+        for fut, city in futures.items():
+            try:
+                curves[city].update(fut.result())
+            except Exception as e:
+                failed_chunks += 1
+                log.warning("city LLM chunk failed city=%s, its days fall back to the baseline: %s", city, e)
+
+    stats = {"cities": 0, "listings": 0, "rows": 0, "llm_calls": len(futures), "failed_chunks": failed_chunks,
+             "fallback_days": 0}
+    for city in cities:
+        rows = signals[city]
+        params = load_params(city)
+        days = [r["dt"] for r in rows]
+        occ = np.array([r["occ"] for r in rows])
+        # Fallback curve: baseline at rooms=1 and pivot occupancy (market x weekend x events).
+        fallback = baseline_price_vec(
+            1, [r["ms_price"] for r in rows], params["occ_pivot"],
+            np.array([r["event_score"] for r in rows]), np.array([d.weekday() for d in days]), params,
+        )
+        quotes = curves[city]
+        curve = np.array([quotes[d][0] if d in quotes else fallback[i] for i, d in enumerate(days)])
+        low_ratio = np.array([quotes[d][1] / quotes[d][0] if d in quotes else 0.9 for d in days])
+        high_ratio = np.array([quotes[d][2] / quotes[d][0] if d in quotes else 1.1 for d in days])
+        reasons = [
+            f"city LLM curve: {quotes[d][3]}" if d in quotes
+            else "city curve fallback: baseline market + weekend + events"
+            for d in days
+        ]
+        stats["fallback_days"] += sum(1 for d in days if d not in quotes)
+
+        listings = list(Listing.objects.filter(city=city).values_list("id", "rooms"))
+        if not listings:
+            continue
+        rooms = np.array([r or 1 for _, r in listings], dtype=np.float64)[:, None]
+        ms_price = np.array([r["ms_price"] for r in rows])
+        prices = adjust_market_curve(curve, ms_price, rooms, occ, params)  # (listings, days)
+        blocked = set(
+            Calendar.objects.filter(listing__city=city, dt__range=(d0, d1), blocked=True)
+            .values_list("listing_id", "dt")
+        )
+
+        recs = [
+            Recommendation(
+                listing_id=lid,
+                dt=d,
+                rec_price=round(float(prices[i, j]), 2),
+                conf_low=round(float(prices[i, j] * low_ratio[j]), 2),
+                conf_high=round(float(prices[i, j] * high_ratio[j]), 2),
+                reason=reasons[j],
+            )
+            for i, (lid, _) in enumerate(listings)
+            for j, d in enumerate(days)
+            if (lid, d) not in blocked
+        ]
+        # Upsert, like the read-path gap-fill: a gap-fill inserting the same
+        # (listing, day) concurrently must not abort the whole city.
+        with transaction.atomic():
+            if blocked:
+                by_listing: Dict = {}
+                for lid, d in blocked:
+                    by_listing.setdefault(lid, []).append(d)
+                stale = Q()
+                for lid, ds in by_listing.items():
+                    stale |= Q(listing_id=lid, dt__in=ds)
+                Recommendation.objects.filter(stale).delete()
+            Recommendation.objects.bulk_create(
+                recs, batch_size=1000, update_conflicts=True, unique_fields=["listing_id", "dt"],
+                update_fields=["rec_price", "conf_low", "conf_high", "reason"],
+            )
+            mark_dirty(lid for lid, _ in listings)
+
+        stats["cities"] += 1
+        stats["listings"] += len(listings)
+        stats["rows"] += len(recs)
+
+    log.info("city LLM run complete start=%s end=%s %s", d0, d1, stats)
+    return stats
@@ -0,0 +1,56 @@
+# apps/llmcore/providers.py
+"""
+LLM provider registry. Providers are registered by name as "package.module:attr"
+strings and imported on first use, so importing views/tasks/price never loads a
+vendor SDK. Web workers only enqueue tasks and never pay for it at all.
+
+A provider is a callable
+    complete(user, system=None, timeout=None, model=None, max_retries=None) -> str
+returning the model's raw text (JSON for every prompt in this app). `timeout`
+bounds each HTTP attempt; with a timeout, retries are off unless `max_retries`
+says otherwise. A call that gives up raises TimeoutError (or a subclass),
+whatever the SDK.
+
+LLM_PROVIDER picks the default ("openai"; "stub" for offline/load runs).
+"""
+import importlib
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+Provider = Callable[..., str]
+
+PROVIDERS: Dict[str, str] = {}
+_loaded: Dict[str, Provider] = {}
+_lock = threading.Lock()
+
+
+def register_provider(name: str, path: str) -> None:
+    """Register (or replace) provider `name` as "package.module:attr"; nothing is imported yet."""
+    with _lock:
+        PROVIDERS[name] = path
+        _loaded.pop(name, None)
+
+
+register_provider("openai", "apps.llmcore.openai_provider:complete")
+register_provider("stub", "apps.llmcore.stub:complete")
+
+
+def default_provider() -> str:
+    return os.getenv("LLM_PROVIDER", "openai")
+
+
+def get_provider(name: Optional[str] = None) -> Provider:
+    """The provider callable for `name` (default: LLM_PROVIDER), importing it on first use."""
+    name = name or default_provider()
+    fn = _loaded.get(name)
+    if fn is not None:
+        return fn
+    path = PROVIDERS.get(name)
+    if path is None:
+        raise KeyError(f"Unknown LLM provider {name!r} (known: {', '.join(sorted(PROVIDERS))})")
+    mod, attr = path.split(":", 1)
+    fn = getattr(importlib.import_module(mod), attr)
+    with _lock:
+        _loaded.setdefault(name, fn)
+    return fn
@@ -0,0 +1,39 @@
+# apps/llmcore/stub.py
+"""
+Offline stand-in for the LLM (LLM_PROVIDER=stub): deterministic quotes after an
+optional artificial latency (LLM_STUB_LATENCY_S). Used by load tests and local runs.
+Registered as the "stub" provider in providers.py.
+"""
+import json
+import os
+import re
+import time
+from datetime import date
+from typing import Optional
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def _price(d_iso: str) -> float:
+    d = date.fromisoformat(d_iso)
+    price = 2500.0 + (d.toordinal() % 20) * 50.0
+    return price * 1.1 if d.weekday() in (4, 5) else price
+
+
+def stub_quote(prompt: str) -> dict:
+    latency = float(os.getenv("LLM_STUB_LATENCY_S", "0"))
+    if latency:
+        time.sleep(latency)
+    dates = _DATE.findall(prompt)
+    if '"days"' in prompt:  # city-level curve prompt: one entry per listed date
+        return {"days": [
+            {"dt": d, "price": _price(d), "low": _price(d) * 0.9, "high": _price(d) * 1.1, "reason": "stub curve"}
+            for d in dates if d != "YYYY-MM-DD"
+        ]}
+    p = _price(dates[0]) if dates else 2500.0
+    return {"price": p, "low": p * 0.9, "high": p * 1.1, "reason": "stub quote"}
+
+
+def complete(user: str, system: Optional[str] = None, timeout: Optional[float] = None,
+             model: Optional[str] = None, max_retries: Optional[int] = None) -> str:
+    return json.dumps(stub_quote(user))
@@ -1,17 +1,47 @@
 # apps/llmcore/tasks.py
 from celery import shared_task
-from .price import generate_llm_prices, generate_llm_prices_range
+from .price import (
+    generate_city_llm_prices,
+    generate_hybrid_prices_range,
+    generate_llm_prices,
+    generate_llm_prices_range,
+)
 
 @shared_task(name="apps.llmcore.tasks.llm_generate_recommendations")
-def llm_generate_recommendations(days_ahead: int = 7):
+def llm_generate_recommendations(days_ahead: int = 7, mode: str = "listing", chunk_size: int = None):
     """
     Existing helper: generates prices for *all* listings, days ahead from today.
+    mode="listing": one LLM call per listing per day, fanned out as
+    llm_generate_chunk tasks of `chunk_size` listings (default BATCH_CHUNK_SIZE,
+    0 = all in this task) so interactive work isn't stuck behind one long task.
+    mode="city": one call per city per chunk of days, fanned out to listings
+    through the baseline rooms/occupancy adjustments.
     """
+    if mode == "city":
+        return generate_city_llm_prices(days_ahead=days_ahead)
+
+    from django.conf import settings
+    from apps.common.batching import chunks
     from apps.listings.models import Listing
-    for lid in Listing.objects.values_list("id", flat=True):
-        generate_llm_prices(str(lid), days_ahead=days_ahead)
+
+    chunk_size = settings.BATCH_CHUNK_SIZE if chunk_size is None else int(chunk_size)
+    ids = [str(lid) for lid in Listing.objects.values_list("id", flat=True)]
+    if chunk_size > 0:
+        for part in chunks(ids, chunk_size):
+            llm_generate_chunk.delay(part, days_ahead)
+        return "ok"
+
+    for lid in ids:
+        generate_llm_prices(lid, days_ahead=days_ahead)
     return "ok"
 
+@shared_task(name="apps.llmcore.tasks.llm_generate_chunk")
+def llm_generate_chunk(listing_ids: list, days_ahead: int = 7):
+    """One slice of llm_generate_recommendations (batch lane)."""
+    for lid in listing_ids:
+        generate_llm_prices(lid, days_ahead=days_ahead)
+    return len(listing_ids)
+
 @shared_task(name="apps.llmcore.tasks.llm_generate_for_range")
 def llm_generate_for_range(listing_id: str, start: str, end: str):
     """
@@ -19,3 +49,11 @@ def llm_generate_for_range(listing_id: str, start: str, end: str):
     """
     generate_llm_prices_range(listing_id, start, end)
     return "ok"
+
+@shared_task(name="apps.llmcore.tasks.llm_hybrid_generate_for_range")
+def llm_hybrid_generate_for_range(listing_id: str, start: str, end: str):
+    """
+    Latency-bounded LLM prices for one listing between [start, end] (YYYY-MM-DD);
+    days the LLM misses fall back to the baseline.
+    """
+    return generate_hybrid_prices_range(listing_id, start, end)
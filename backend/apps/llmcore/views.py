@@ -3,7 +3,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
-from .tasks import llm_generate_for_range
+from .tasks import llm_generate_for_range, llm_hybrid_generate_for_range
 
 @api_view(["POST"])
 def quote(request):
@@ -12,18 +12,25 @@ def quote(request):
       {
         "listing_id": "<uuid>",
         "start": "YYYY-MM-DD",
-        "end":   "YYYY-MM-DD"
+        "end":   "YYYY-MM-DD",
+        "mode":  "llm" | "hybrid"   (optional, default "llm")
       }
-    Enqueues a Celery task and returns immediately.
+    Enqueues a Celery task and returns immediately. "hybrid" bounds LLM latency
+    per call and falls back to the baseline for days the LLM misses.
     """
     listing_id = request.data.get("listing_id")
     start = request.data.get("start")
     end = request.data.get("end")
+    mode = request.data.get("mode", "llm")
 
     if not listing_id:
         return Response({"detail": "listing_id is required"}, status=status.HTTP_400_BAD_REQUEST)
     if not (start and end):
         return Response({"detail": "start and end are required (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
 
-    llm_generate_for_range.delay(listing_id, start, end)
-    return Response({"ok": True})
+    if mode not in ("llm", "hybrid"):
+        return Response({"detail": "mode must be 'llm' or 'hybrid'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    task = llm_hybrid_generate_for_range if mode == "hybrid" else llm_generate_for_range
+    task.delay(listing_id, start, end)
+    return Response({"ok": True, "mode": mode})
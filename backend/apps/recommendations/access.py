@@ -0,0 +1,62 @@
+# apps/recommendations/access.py
+"""
+Access-pattern tracking for the recommendations read path.
+
+Counters live in Redis so every web worker contributes to the same picture:
+  recs:hot:<yyyymmdd>  sorted set, listing_id -> requests that day (expires)
+  recs:reach           sorted set, listing_id -> furthest requested date (ordinal)
+Tracking is best-effort: a Redis outage must never fail a user request.
+"""
+import logging
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+import redis
+
+from apps.common.redis_client import Backoff, get_redis
+
+log = logging.getLogger(__name__)
+
+HOT_PREFIX = "recs:hot:"
+REACH_KEY = "recs:reach"
+HOT_BUCKET_TTL_S = 8 * 24 * 3600
+
+_backoff = Backoff("access tracking")
+
+
+def record_access(listing_id: str, start: date, end: date) -> None:
+    if not _backoff.ready():
+        return
+    key = HOT_PREFIX + date.today().strftime("%Y%m%d")
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zincrby(key, 1, str(listing_id))
+        pipe.expire(key, HOT_BUCKET_TTL_S)
+        pipe.zadd(REACH_KEY, {str(listing_id): end.toordinal()}, gt=True)
+        pipe.execute()
+    except redis.RedisError as e:
+        _backoff.trip(e)
+
+
+def hot_listings(top_n: int = 50, days: int = 7) -> List[Tuple[str, float, Optional[date]]]:
+    """
+    Most requested listings over the last `days` days, as
+    (listing_id, hits, furthest requested date or None). Empty on Redis errors.
+    """
+    today = date.today()
+    keys = [HOT_PREFIX + (today - timedelta(days=i)).strftime("%Y%m%d") for i in range(days)]
+    dest = f"{HOT_PREFIX}{days}d"
+    try:
+        r = get_redis()
+        r.zunionstore(dest, keys)
+        top = r.zrevrange(dest, 0, top_n - 1, withscores=True)
+        if not top:
+            return []
+        reach = r.zmscore(REACH_KEY, [lid for lid, _ in top])
+    except redis.RedisError as e:
+        log.warning("hot listing lookup failed: %s", e)
+        return []
+    return [
+        (lid.decode(), hits, date.fromordinal(int(o)) if o else None)
+        for (lid, hits), o in zip(top, reach)
+    ]
@@ -3,3 +3,14 @@ from django.apps import AppConfig
 class RecommendationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.recommendations"
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from apps.listings.models import FeaturesDaily, MarketSample
+        from .market_cache import _on_row_change
+
+        # Row-level saves invalidate the city market cache in every worker (batched
+        # per transaction). Bulk writers and deletes call market_cache.invalidate_city
+        # themselves: a delete receiver would turn QuerySet.delete() into per-row work.
+        for model in (MarketSample, FeaturesDaily):
+            post_save.connect(_on_row_change, sender=model, dispatch_uid=f"market_cache.save.{model.__name__}")
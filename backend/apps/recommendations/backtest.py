@@ -0,0 +1,201 @@
+# apps/recommendations/backtest.py
+"""
+Vectorized backtesting of pricing strategies against historical market data.
+
+History is loaded from the ORM once per city into NumPy arrays in the parent
+process; the evaluation itself is pure NumPy so cities can be spread across a
+process pool without touching the database from the workers.
+"""
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from apps.listings.models import Listing, MarketSample, FeaturesDaily
+from .pricing import baseline_price_vec, load_params
+
+# strategy(history, rooms) -> np.ndarray of prices aligned with history["dt"];
+# history["params"] holds the city's production (tuned) coefficients
+Strategy = Callable[[Dict[str, np.ndarray], int], np.ndarray]
+
+STRATEGIES: Dict[str, Strategy] = {}
+
+
+def register_strategy(name: str):
+    def deco(fn: Strategy) -> Strategy:
+        STRATEGIES[name] = fn
+        return fn
+    return deco
+
+
+@register_strategy("baseline")
+def _baseline_strategy(h: Dict[str, np.ndarray], rooms: int) -> np.ndarray:
+    # DEFAULT_PARAMS: the untuned formula, for comparison with "tuned".
+    return baseline_price_vec(rooms, h["price"], h["occ"], h["event_score"], h["dow"])
+
+
+@register_strategy("tuned")
+def _tuned_strategy(h: Dict[str, np.ndarray], rooms: int) -> np.ndarray:
+    # What production charges: the city's PricingParams (DEFAULT_PARAMS when untuned).
+    return baseline_price_vec(rooms, h["price"], h["occ"], h["event_score"], h["dow"], h["params"])
+
+
+@register_strategy("market")
+def _market_strategy(h: Dict[str, np.ndarray], rooms: int) -> np.ndarray:
+    # Naive reference: charge the city market rate as-is.
+    return h["price"].copy()
+
+
+def resolve_strategy(name: str) -> Strategy:
+    """
+    Look up a registered strategy, or import one given as "package.module:function".
+    """
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    if ":" in name:
+        mod, attr = name.split(":", 1)
+        return getattr(importlib.import_module(mod), attr)
+    raise KeyError(f"Unknown strategy {name!r} (known: {', '.join(sorted(STRATEGIES))})")
+
+
+def load_city_history(city: str, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """
+    One row per day with a MarketSample for `city` whose occupancy was observed
+    (rate-only rows carry a placeholder), features joined on dt (missing
+    features count as neutral).
+    """
+    ms = MarketSample.objects.filter(city=city, occupancy_observed=True)
+    ft = FeaturesDaily.objects.filter(city=city)
+    if start:
+        ms, ft = ms.filter(dt__gte=start), ft.filter(dt__gte=start)
+    if end:
+        ms, ft = ms.filter(dt__lte=end), ft.filter(dt__lte=end)
+
+    rows = list(ms.order_by("dt").values_list("dt", "price", "occupancy"))
+    n = len(rows)
+    dt = np.array([r[0] for r in rows], dtype="datetime64[D]")
+    price = np.fromiter((float(r[1]) for r in rows), dtype=np.float64, count=n)
+    occ = np.fromiter((float(r[2]) for r in rows), dtype=np.float64, count=n)
+
+    event_score = np.zeros(n, dtype=np.float64)
+    is_holiday = np.zeros(n, dtype=bool)
+    feats = list(ft.values_list("dt", "event_score", "is_holiday"))
+    if feats and n:
+        f_dt = np.array([f[0] for f in feats], dtype="datetime64[D]")
+        idx = np.searchsorted(dt, f_dt)
+        hit = (idx < n) & (dt[np.minimum(idx, n - 1)] == f_dt)
+        event_score[idx[hit]] = np.array([float(f[1]) for f in feats])[hit]
+        is_holiday[idx[hit]] = np.array([bool(f[2]) for f in feats])[hit]
+
+    # numpy epoch (1970-01-01) was a Thursday; shift so Monday == 0 like date.weekday()
+    dow = (dt.astype(np.int64) + 3) % 7
+
+    return {
+        "dt": dt,
+        "price": price,
+        "occ": occ,
+        "event_score": event_score,
+        "is_holiday": is_holiday,
+        "dow": dow,
+    }
+
+
+def _lagged(h: Dict[str, np.ndarray], lead_days: int) -> Dict[str, np.ndarray]:
+    """
+    Market signals (price, occupancy) as they were known `lead_days` before each
+    stay date. Calendar facts (day of week, events, holidays) are known in advance
+    and stay aligned to the stay date. Rows without a market observation that far
+    back are dropped (calendar gaps are respected).
+    """
+    if lead_days <= 0:
+        return h
+    dt = h["dt"]
+    src = np.searchsorted(dt, dt - np.timedelta64(lead_days, "D"))
+    ok = (src < len(dt)) & (dt[np.minimum(src, len(dt) - 1)] == dt - np.timedelta64(lead_days, "D"))
+    signals = {k: h[k][src[ok]] for k in ("price", "occ")}
+    for k in ("dt", "dow", "event_score", "is_holiday"):  # belong to the stay date
+        signals[k] = h[k][ok]
+    signals["_rows"] = np.nonzero(ok)[0]
+    return signals
+
+
+def evaluate(prices: np.ndarray, market_price: np.ndarray, market_occ: np.ndarray,
+             elasticity: float = 1.5) -> Dict[str, float]:
+    """
+    Error metrics against the realized market price plus a revenue proxy:
+    expected occupancy is the realized market occupancy scaled by
+    (market_price / price) ** elasticity and capped at 100%.
+    """
+    if len(prices) == 0:
+        return {"days": 0, "mae": 0.0, "mape": 0.0, "bias": 0.0,
+                "revenue": 0.0, "market_revenue": 0.0, "revenue_uplift": 0.0}
+    err = prices - market_price
+    occ = market_occ / 100.0
+    exp_occ = np.clip(occ * (market_price / prices) ** elasticity, 0.0, 1.0)
+    revenue = float(np.sum(prices * exp_occ))
+    market_revenue = float(np.sum(market_price * occ))
+    return {
+        "days": int(len(prices)),
+        "mae": float(np.mean(np.abs(err))),
+        "mape": float(np.mean(np.abs(err) / market_price) * 100.0),
+        "bias": float(np.mean(err)),
+        "revenue": revenue,
+        "market_revenue": market_revenue,
+        "revenue_uplift": (revenue / market_revenue - 1.0) if market_revenue else 0.0,
+    }
+
+
+def _evaluate_city(job: dict) -> dict:
+    # Runs inside pool workers: NumPy only, no ORM access.
+    h = job["history"]
+    fn = resolve_strategy(job["strategy"])
+    signals = _lagged(h, job["lead_days"])
+    signals["params"] = job["params"]
+    rows = signals.pop("_rows", None)
+    real_price = h["price"] if rows is None else h["price"][rows]
+    real_occ = h["occ"] if rows is None else h["occ"][rows]
+
+    by_rooms = {}
+    for rooms in job["rooms"]:
+        prices = np.asarray(fn(signals, rooms), dtype=np.float64)
+        by_rooms[rooms] = evaluate(prices, real_price, real_occ, job["elasticity"])
+    return {"city": job["city"], "rooms": by_rooms}
+
+
+def run_backtest(cities: Optional[Iterable[str]] = None, strategy: str = "baseline",
+                 rooms: Optional[Iterable[int]] = None, start: Optional[date] = None,
+                 end: Optional[date] = None, workers: Optional[int] = None,
+                 lead_days: int = 0, elasticity: float = 1.5) -> List[dict]:
+    """
+    Backtest `strategy` for every city (default: all cities with market data).
+    `rooms` defaults to the distinct room counts of the city's listings.
+    Returns one result dict per city: {"city": ..., "rooms": {n: metrics}}.
+    """
+    resolve_strategy(strategy)  # fail fast on typos, before spawning workers
+    if cities is None:
+        cities = MarketSample.objects.values_list("city", flat=True).distinct()
+    cities = sorted(set(cities))
+
+    jobs = []
+    for city in cities:
+        city_rooms = sorted(set(rooms)) if rooms else sorted(
+            set(Listing.objects.filter(city=city).values_list("rooms", flat=True))
+        ) or [1]
+        jobs.append({
+            "city": city,
+            "history": load_city_history(city, start, end),
+            "params": load_params(city),  # read here: workers never touch the ORM
+            "strategy": strategy,
+            "rooms": city_rooms,
+            "lead_days": int(lead_days),
+            "elasticity": float(elasticity),
+        })
+
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        return [_evaluate_city(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_evaluate_city, jobs))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.recommendations.tuning import OBJECTIVES, tune
+
+
+class Command(BaseCommand):
+    help = "Search baseline pricing coefficients per city and store the best set in PricingParams"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--city", action="append", dest="cities",
+                            help="City to tune (repeatable). Default: every city with listings.")
+        parser.add_argument("--method", choices=["random", "grid"], default="random")
+        parser.add_argument("--samples", type=int, default=2000, help="Random search: candidates per city")
+        parser.add_argument("--steps", type=int, default=3, help="Grid search: points per coefficient")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--objective", choices=OBJECTIVES, default="revenue")
+        parser.add_argument("--elasticity", type=float, default=1.5,
+                            help="Demand elasticity used by the revenue proxy.")
+        parser.add_argument("--from", dest="start", help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--to", dest="end", help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+        parser.add_argument("--dry-run", action="store_true", help="Report results without saving")
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        try:
+            results = tune(
+                cities=opts["cities"],
+                method=opts["method"],
+                samples=opts["samples"],
+                steps=opts["steps"],
+                seed=opts["seed"],
+                objective=opts["objective"],
+                elasticity=opts["elasticity"],
+                start=parse_date(opts["start"]) if opts["start"] else None,
+                end=parse_date(opts["end"]) if opts["end"] else None,
+                workers=opts["workers"],
+                save=not opts["dry_run"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for res in results:
+            base = res["default_score"]
+            gain = (res["score"] - base) / abs(base) * 100.0 if base else 0.0
+            params = ", ".join(f"{k}={v:.3g}" for k, v in res["params"].items())
+            self.stdout.write(f"{res['city']:<14} {opts['objective']} {base:.1f} -> {res['score']:.1f} "
+                              f"({gain:+.2f}%)  {params}")
+        verb = "Evaluated" if opts["dry_run"] else "Tuned and saved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(results)} cities in {time.perf_counter() - t0:.2f}s"
+        ))
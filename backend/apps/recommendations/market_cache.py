@@ -0,0 +1,206 @@
+# apps/recommendations/market_cache.py
+"""
+Per-worker LRU of city market/feature windows as compact NumPy arrays.
+
+Entries are keyed by (city, start, end) and hold, per day: market price and
+occupancy (already resolved through _fallback_market for days without a
+MarketSample), event score and holiday flag. A request for a window inside a
+cached one is served by slicing, so back-to-back generations for listings in
+the same city do no market queries at all.
+
+Invalidation: saving a MarketSample or FeaturesDaily row, or calling
+invalidate_city after bulk writes and deletes (there is no delete signal, so
+QuerySet.delete() stays a single fast DELETE), drops the city locally and
+publishes it on Redis; every worker's listener thread drops it too. Cities are
+collected per transaction and each is dropped/published once on commit.
+Entries also expire after MARKET_CACHE_TTL_S, which bounds staleness if Redis
+is unreachable.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from apps.common.redis_client import get_redis, pubsub
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "market-cache:invalidate"
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple[str, date, date], dict]" = OrderedDict()
+# Bumped by every invalidation ("*" for all cities): a load that raced one is not cached.
+_generations: Dict[str, int] = {}
+_listener_pid: Optional[int] = None
+_pending = threading.local()  # cities invalidated by this thread's open transaction
+stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _load(city: str, start: date, end: date) -> dict:
+    from apps.listings.models import MarketSample, FeaturesDaily
+    from .tasks import _fallback_market
+
+    n = (end - start).days + 1
+    ms_price = np.empty(n)
+    occ = np.empty(n)
+    event_score = np.zeros(n)
+    is_holiday = np.zeros(n, dtype=bool)
+    reason_extra: List[str] = [""] * n
+
+    ms_map = {
+        dt: (float(p), float(o))
+        for dt, p, o in MarketSample.objects.filter(city=city, dt__range=(start, end))
+        .values_list("dt", "price", "occupancy")
+    }
+    for dt, ev, hol in FeaturesDaily.objects.filter(city=city, dt__range=(start, end)).values_list(
+        "dt", "event_score", "is_holiday"
+    ):
+        i = (dt - start).days
+        event_score[i] = float(ev)
+        is_holiday[i] = bool(hol)
+    for i in range(n):
+        d = start + timedelta(days=i)
+        hit = ms_map.get(d)
+        if hit is not None:
+            ms_price[i], occ[i] = hit
+        else:
+            ms_price[i], occ[i], reason_extra[i] = _fallback_market(city, d)
+
+    return {
+        "start": start,
+        "ms_price": ms_price,
+        "occ": occ,
+        "event_score": event_score,
+        "is_holiday": is_holiday,
+        "reason_extra": reason_extra,
+        "loaded_at": time.monotonic(),
+    }
+
+
+def _slice(entry: dict, start: date, end: date) -> dict:
+    i = (start - entry["start"]).days
+    j = (end - entry["start"]).days + 1
+    return {
+        "start": start,
+        "ms_price": entry["ms_price"][i:j],
+        "occ": entry["occ"][i:j],
+        "event_score": entry["event_score"][i:j],
+        "is_holiday": entry["is_holiday"][i:j],
+        "reason_extra": entry["reason_extra"][i:j],
+    }
+
+
+def market_window(city: str, start: date, end: date) -> dict:
+    """
+    Arrays for every day of [start, end] inclusive (see module docstring).
+    Treat the returned arrays as read-only: they may be views into the cache.
+    """
+    _ensure_listener()
+    ttl = settings.MARKET_CACHE_TTL_S
+    now = time.monotonic()
+    with _lock:
+        for key in list(_entries):
+            c, s, e = key
+            if c != city or not (s <= start and end <= e):
+                continue
+            entry = _entries[key]
+            if now - entry["loaded_at"] > ttl:
+                del _entries[key]
+                continue
+            _entries.move_to_end(key)
+            stats["hits"] += 1
+            return _slice(entry, start, end)
+        stats["misses"] += 1
+        gen = (_generations.get("*", 0), _generations.get(city, 0))
+
+    entry = _load(city, start, end)
+    with _lock:
+        if gen != (_generations.get("*", 0), _generations.get(city, 0)):
+            # Invalidated while we were reading: serve this load, but don't keep it.
+            return _slice(entry, start, end)
+        _entries[(city, start, end)] = entry
+        _entries.move_to_end((city, start, end))
+        while len(_entries) > settings.MARKET_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return _slice(entry, start, end)
+
+
+def _drop_local(city: Optional[str]) -> None:
+    with _lock:
+        for key in [k for k in _entries if city is None or k[0] == city]:
+            del _entries[key]
+        _generations[city or "*"] = _generations.get(city or "*", 0) + 1
+        stats["invalidations"] += 1
+
+
+def _flush_pending() -> None:
+    cities: Set[str] = getattr(_pending, "cities", set())
+    _pending.cities = set()
+    if "*" in cities:
+        cities = {"*"}
+    for city in cities:
+        _drop_local(None if city == "*" else city)
+        try:
+            get_redis().publish(CHANNEL, city)
+        except redis.RedisError as e:
+            log.warning("market cache invalidation not published (city=%s): %s", city, e)
+
+
+def invalidate_city(city: Optional[str] = None) -> None:
+    """
+    Drop `city` (None = everything) here and in every other worker, once the
+    current transaction commits so nobody reloads the old rows. Repeated calls
+    inside one transaction drop/publish each city once.
+    """
+    if not hasattr(_pending, "cities"):
+        _pending.cities = set()
+    _pending.cities.add(city or "*")
+    # Every call queues the flush (cheap); the first to run empties the set and the
+    # rest are no-ops. Cities left by a rolled-back transaction go out with the next one.
+    transaction.on_commit(_flush_pending)
+
+
+def _listen() -> None:
+    backoff = 1.0
+    while True:
+        subscribed = False
+        try:
+            ps = pubsub(ignore_subscribe_messages=True)
+            ps.subscribe(CHANNEL)
+            subscribed = True
+            backoff = 1.0
+            for msg in ps.listen():
+                city = msg["data"].decode() if isinstance(msg["data"], bytes) else str(msg["data"])
+                _drop_local(None if city == "*" else city)
+        except redis.RedisError as e:
+            if subscribed:
+                # Messages may have been missed while the connection was down.
+                _drop_local(None)
+            log.info("market cache listener reconnecting in %.0fs: %s", backoff, e)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+
+def _ensure_listener() -> None:
+    # One listener per process; re-checked by pid so forked workers start their own.
+    global _listener_pid
+    if _listener_pid == os.getpid() or not settings.MARKET_CACHE_PUBSUB:
+        return
+    with _lock:
+        if _listener_pid == os.getpid():
+            return
+        _entries.clear()  # never trust entries inherited from a parent process
+        _listener_pid = os.getpid()
+    threading.Thread(target=_listen, name="market-cache-listener", daemon=True).start()
+
+
+def _on_row_change(sender, instance, **kwargs):
+    invalidate_city(instance.city)
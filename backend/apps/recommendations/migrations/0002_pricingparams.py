@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-19 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingParams',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=80, unique=True)),
+                ('params', models.JSONField(default=dict)),
+                ('objective', models.CharField(default='revenue', max_length=40)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('default_score', models.FloatField(blank=True, null=True)),
+                ('n_days', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -12,3 +12,16 @@ class Recommendation(models.Model):
     class Meta:
         unique_together = ("listing_id", "dt")
         indexes = [models.Index(fields=["listing_id", "dt"])]
+
+class PricingParams(models.Model):
+    """Tuned baseline coefficients for one city (see pricing.DEFAULT_PARAMS)."""
+    city = models.CharField(max_length=80, unique=True)
+    params = models.JSONField(default=dict)
+    objective = models.CharField(max_length=40, default="revenue")
+    score = models.FloatField(null=True, blank=True)          # objective with tuned params
+    default_score = models.FloatField(null=True, blank=True)  # objective with DEFAULT_PARAMS
+    n_days = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"PricingParams({self.city})"
@@ -0,0 +1,87 @@
+# apps/recommendations/pricing.py
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+# Coefficients of the baseline formula; tuned per city by `manage.py tune_baseline`.
+DEFAULT_PARAMS: Dict[str, float] = {
+    "room_uplift": 0.08,     # per room beyond the first
+    "occ_pivot": 65.0,       # occupancy % with no adjustment
+    "occ_divisor": 300.0,    # occupancy points per 100% adjustment
+    "weekend_uplift": 1.10,  # Fri/Sat multiplier
+    "event_divisor": 50.0,   # event_score points per 100% lift
+    "floor": 1000.0,         # absolute minimum price
+    "cap_mult": 2.0,         # maximum as a multiple of the market price
+}
+
+
+def baseline_price_vec(rooms, ms_price, occ, event_score, dow, params: Optional[dict] = None) -> np.ndarray:
+    """
+    The baseline formula: market price adjusted for rooms, occupancy, Fri/Sat and
+    events, then clamped to [floor, market * cap_mult]. Every argument (and every
+    value in `params`) may be a scalar or an array; they are broadcast together
+    and one price per element is returned.
+    """
+    p = DEFAULT_PARAMS if params is None else {**DEFAULT_PARAMS, **params}
+    ms_price = np.asarray(ms_price, dtype=np.float64)
+    rooms = np.asarray(rooms, dtype=np.float64)
+    occ = np.asarray(occ, dtype=np.float64)
+    event_score = np.asarray(event_score, dtype=np.float64)
+    dow = np.asarray(dow)
+
+    base = ms_price * (1 + p["room_uplift"] * np.maximum(0.0, rooms - 1))
+    base = base * (1 + (occ - p["occ_pivot"]) / p["occ_divisor"])
+    base = np.where((dow == 4) | (dow == 5), base * p["weekend_uplift"], base)  # Fri/Sat
+    base = base * (1 + event_score / p["event_divisor"])
+    return np.maximum(p["floor"], np.minimum(base, ms_price * p["cap_mult"]))
+
+
+_params_cache: Dict[str, Tuple[float, dict]] = {}
+
+
+def load_params(city: str) -> dict:
+    """
+    Tuned coefficients for `city` (DEFAULT_PARAMS when none are stored).
+    Cached per process for PRICING_PARAMS_CACHE_S seconds.
+    """
+    now = time.monotonic()
+    hit = _params_cache.get(city)
+    if hit and hit[0] > now:
+        return hit[1]
+
+    from .models import PricingParams  # keep this module importable without the app registry
+
+    row = PricingParams.objects.filter(city=city).values_list("params", flat=True).first()
+    params = {**DEFAULT_PARAMS, **(row or {})}
+    ttl = float(getattr(settings, "PRICING_PARAMS_CACHE_S", 300))
+    _params_cache[city] = (now + ttl, params)
+    return params
+
+
+def clear_params_cache(city: Optional[str] = None) -> None:
+    if city is None:
+        _params_cache.clear()
+    else:
+        _params_cache.pop(city, None)
+
+
+def adjust_market_curve(curve, ms_price, rooms, occ, params: Optional[dict] = None) -> np.ndarray:
+    """
+    Listing prices from a city-level market curve: the rooms and occupancy terms
+    of the baseline, then the baseline's guardrails, [floor, ms_price * cap_mult].
+    The cap is relative to the observed market price, not to the curve, so a
+    curve far off the market cannot carry listings with it.
+    Weekend and event lifts are assumed to be in the curve already.
+    Pass rooms as an (L, 1) column to price L listings x D days in one call.
+    """
+    p = DEFAULT_PARAMS if params is None else {**DEFAULT_PARAMS, **params}
+    curve = np.asarray(curve, dtype=np.float64)
+    ms_price = np.asarray(ms_price, dtype=np.float64)
+    rooms = np.asarray(rooms, dtype=np.float64)
+    occ = np.asarray(occ, dtype=np.float64)
+
+    base = curve * (1 + p["room_uplift"] * np.maximum(0.0, rooms - 1))
+    base = base * (1 + (occ - p["occ_pivot"]) / p["occ_divisor"])
+    return np.maximum(p["floor"], np.minimum(base, ms_price * p["cap_mult"]))
@@ -1,21 +1,22 @@
 # apps/recommendations/tasks.py
+import logging
 from datetime import date, timedelta
-from typing import Dict, List, Tuple
+from typing import List, Set, Tuple
+
+import numpy as np
 from celery import shared_task
+from django.conf import settings
 from django.db import transaction
 from django.db.models import Avg
 
-from apps.listings.models import Listing, MarketSample, FeaturesDaily
+from apps.common.profiling import phase
+from apps.llmcore.comps import mark_dirty
+from apps.listings.models import Calendar, Listing, MarketSample
+from .market_cache import market_window
 from .models import Recommendation
+from .pricing import baseline_price_vec, load_params
 
-
-def _baseline_price(rooms: int, ms_price: float, occ: float, event_score: float, dow: int) -> float:
-    base = ms_price * (1 + 0.08 * max(0, rooms - 1))
-    base *= (1 + (occ - 65) / 300.0)
-    if dow in (4, 5):  # Fri/Sat
-        base *= 1.10
-    base *= (1 + event_score / 50.0)
-    return max(1000.0, min(base, ms_price * 2.0))
+log = logging.getLogger(__name__)
 
 
 def _daterange(start: date, end: date):
@@ -52,12 +53,45 @@ def _fallback_market(city: str, target: date) -> Tuple[float, float, str]:
     return 2500.0, 65.0, " (fallback: defaults)"
 
 
+def blocked_days(listing_id, start: date, end: date) -> Set[date]:
+    """Days in [start, end] the host has blocked (Calendar.blocked); never priced."""
+    return set(
+        Calendar.objects.filter(listing_id=listing_id, dt__range=(start, end), blocked=True)
+        .values_list("dt", flat=True)
+    )
+
+
+BASELINE_REASON = "baseline: market + occupancy + weekend + events"
+
+
+def baseline_window(listing: Listing, start: date, end: date) -> Tuple[List[Tuple[date, float, str]], int]:
+    """
+    Baseline (day, price, reason) for every day of [start, end] inclusive, priced in one
+    vectorized pass with the city's tuned params. Market/feature arrays come from the
+    per-worker city cache. Days without a MarketSample use _fallback_market and say so
+    in the reason. Returns (rows, fallback_days).
+    """
+    mw = market_window(listing.city, start, end)
+    days = list(_daterange(start, end))
+    prices = baseline_price_vec(
+        rooms=listing.rooms or 1,
+        ms_price=mw["ms_price"],
+        occ=mw["occ"],
+        event_score=mw["event_score"],
+        dow=np.array([d.weekday() for d in days]),
+        params=load_params(listing.city),
+    )
+    rows = [(d, float(p), BASELINE_REASON + extra) for d, p, extra in zip(days, prices, mw["reason_extra"])]
+    return rows, sum(1 for extra in mw["reason_extra"] if extra)
+
+
 @shared_task
 def generate_recommendations_for_listing(listing_id: str, date_from: str, date_to: str, replace: bool = True):
     """
     Generate recommendations ONLY for the given listing and [date_from, date_to] inclusive (ISO yyyy-mm-dd).
     If `replace=True`, existing recs in that range for this listing are removed first.
     Uses recent/city averages as fallback when MarketSample rows are missing so the API never returns [].
+    Blocked calendar days are skipped (and their old rows dropped when replacing).
     """
     # Parse & normalize dates
     start = date.fromisoformat(str(date_from))
@@ -65,68 +99,153 @@ def generate_recommendations_for_listing(listing_id: str, date_from: str, date_t
     if end < start:
         start, end = end, start
 
-    listing = Listing.objects.get(id=listing_id)
-
-    # Preload window rows
-    ms_map: Dict[date, MarketSample] = {
-        r.dt: r
-        for r in MarketSample.objects.filter(city=listing.city, dt__range=(start, end))
-    }
-    ft_map: Dict[date, FeaturesDaily] = {
-        r.dt: r
-        for r in FeaturesDaily.objects.filter(city=listing.city, dt__range=(start, end))
-    }
-
-    recs: List[Recommendation] = []
-    missing_exact_days = 0
-    used_fallback_days = 0
-
-    for d in _daterange(start, end):
-        ms = ms_map.get(d)
-        if ms is not None:
-            ms_price = float(ms.price)
-            occ = float(ms.occupancy)
-            reason_extra = ""
-        else:
-            missing_exact_days += 1
-            ms_price, occ, reason_extra = _fallback_market(listing.city, d)
-            used_fallback_days += 1
-
-        ft = ft_map.get(d)
-        event_score = float(ft.event_score) if ft else 0.0
-
-        price = _baseline_price(
-            rooms=listing.rooms or 1,
-            ms_price=ms_price,
-            occ=occ,
-            event_score=event_score,
-            dow=d.weekday(),
+    with phase("lookup"):
+        listing = Listing.objects.get(id=listing_id)
+        blocked = blocked_days(listing.id, start, end)
+    with phase("pricing"):
+        rows, used_fallback_days = baseline_window(listing, start, end)
+
+    recs: List[Recommendation] = [
+        Recommendation(
+            listing_id=listing.id,
+            dt=d,
+            rec_price=round(price, 2),
+            conf_low=round(price * 0.9, 2),
+            conf_high=round(price * 1.1, 2),
+            reason=reason,
         )
+        for d, price, reason in rows
+        if d not in blocked
+    ]
 
-        recs.append(
-            Recommendation(
-                listing_id=listing.id,
-                dt=d,
-                rec_price=round(price, 2),
-                conf_low=round(price * 0.9, 2),
-                conf_high=round(price * 1.1, 2),
-                reason="baseline: market + occupancy + weekend + events" + reason_extra,
-            )
-        )
-
-    with transaction.atomic():
+    with phase("write"), transaction.atomic():
         if replace:
             Recommendation.objects.filter(
                 listing_id=listing.id, dt__range=(start, end)
             ).delete()
         if recs:
-            Recommendation.objects.bulk_create(recs, batch_size=500)
+            # Upsert: the warmers and the read path's gap-fill may write the same days concurrently.
+            Recommendation.objects.bulk_create(
+                recs,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=["listing_id", "dt"],
+                update_fields=["rec_price", "conf_low", "conf_high", "reason"],
+            )
+            mark_dirty([listing.id])  # bulk_create sends no post_save
 
     return {
         "listing_id": str(listing.id),
         "from": start.isoformat(),
         "to": end.isoformat(),
         "created": len(recs),
-        "missing_exact_market_days": missing_exact_days,
+        "skipped_blocked": len(blocked),
+        "missing_exact_market_days": used_fallback_days,
         "used_fallback_days": used_fallback_days,
     }
+
+
+def _baseline_owned(reason: str) -> bool:
+    # Rows this module wrote; hybrid fallbacks also start with BASELINE_REASON but carry " [fallback: ...]".
+    return reason.startswith(BASELINE_REASON) and " [fallback:" not in reason
+
+
+def warm_listing(listing_id: str, days_ahead: int) -> int:
+    """
+    Bring [today, today + days_ahead) up to date for one listing in one vectorized
+    pass: missing days are generated and baseline rows are re-priced when market
+    data or tuned params moved them. LLM/hybrid/city rows and blocked days are left
+    alone. Returns the number of rows written.
+    """
+    start = date.today()
+    end = start + timedelta(days=max(1, int(days_ahead)) - 1)
+    listing = Listing.objects.get(id=listing_id)
+    blocked = blocked_days(listing.id, start, end)
+    existing = {
+        dt: (float(price), reason)
+        for dt, price, reason in Recommendation.objects.filter(listing_id=listing.id, dt__range=(start, end))
+        .values_list("dt", "rec_price", "reason")
+    }
+    rows, _ = baseline_window(listing, start, end)
+
+    recs: List[Recommendation] = []
+    for d, price, reason in rows:
+        price = round(price, 2)
+        old = existing.get(d)
+        if d in blocked or (old is not None and (not _baseline_owned(old[1]) or old == (price, reason))):
+            continue
+        recs.append(Recommendation(
+            listing_id=listing.id, dt=d, rec_price=price,
+            conf_low=round(price * 0.9, 2), conf_high=round(price * 1.1, 2), reason=reason,
+        ))
+    if recs:
+        Recommendation.objects.bulk_create(
+            recs,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["listing_id", "dt"],
+            update_fields=["rec_price", "conf_low", "conf_high", "reason"],
+        )
+        mark_dirty([listing.id])
+    return len(recs)
+
+
+@shared_task(name="apps.recommendations.tasks.warm_listings_chunk")
+def warm_listings_chunk(listing_ids: List[str], days_ahead: int):
+    """One slice of the fleet-wide warmer (batch lane)."""
+    written = sum(warm_listing(lid, days_ahead) for lid in listing_ids)
+    return {"listings": len(listing_ids), "written": written}
+
+
+@shared_task(name="apps.recommendations.tasks.generate_recommendations")
+def generate_recommendations(days_ahead: int = None, chunk_size: int = None):
+    """
+    Rolling-horizon warmer: keep the next `days_ahead` days precomputed and current for
+    every listing. Missing days are generated and baseline rows re-priced against
+    today's market data and params (see warm_listing); unchanged rows are not rewritten.
+    With chunk_size > 0 (default BATCH_CHUNK_SIZE) the fleet is fanned out as
+    warm_listings_chunk tasks so other work can run between them.
+    """
+    from apps.common.batching import chunks
+
+    days_ahead = days_ahead or settings.RECS_WARM_HORIZON_DAYS
+    chunk_size = settings.BATCH_CHUNK_SIZE if chunk_size is None else int(chunk_size)
+    ids = [str(lid) for lid in Listing.objects.values_list("id", flat=True)]
+    if chunk_size > 0:
+        parts = list(chunks(ids, chunk_size))
+        for part in parts:
+            warm_listings_chunk.delay(part, days_ahead)
+        log.info("warmer fanned out listings=%s horizon=%s chunks=%s", len(ids), days_ahead, len(parts))
+        return {"listings": len(ids), "days_ahead": days_ahead, "chunks": len(parts)}
+
+    written = sum(warm_listing(lid, days_ahead) for lid in ids)
+    log.info("warmed listings=%s horizon=%s written=%s", len(ids), days_ahead, written)
+    return {"listings": len(ids), "days_ahead": days_ahead, "written": written}
+
+
+@shared_task(name="apps.recommendations.tasks.warm_hot_listings")
+def warm_hot_listings(top_n: int = None, days_ahead: int = None):
+    """
+    Prewarm the most requested listings (see access.py) further ahead than the
+    fleet-wide horizon: at least `days_ahead`, and a month past the furthest
+    date anyone has asked for.
+    """
+    from .access import hot_listings
+
+    top_n = top_n or settings.RECS_HOT_TOP_N
+    days_ahead = days_ahead or settings.RECS_HOT_HORIZON_DAYS
+    today = date.today()
+    known = {str(i) for i in Listing.objects.values_list("id", flat=True)}
+
+    warmed = 0
+    written = 0
+    for lid, _hits, reach in hot_listings(top_n):
+        if lid not in known:
+            continue
+        horizon = days_ahead
+        if reach is not None:
+            horizon = max(horizon, (reach - today).days + 31)
+        written += warm_listing(lid, min(horizon, settings.RECS_MAX_HORIZON_DAYS))
+        warmed += 1
+    log.info("warmed hot listings=%s written=%s", warmed, written)
+    return {"listings": warmed, "written": written}
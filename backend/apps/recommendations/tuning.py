@@ -0,0 +1,147 @@
+# apps/recommendations/tuning.py
+"""
+Per-city parameter search for the baseline pricing coefficients.
+
+Candidates are evaluated in blocks: each parameter becomes a (C, 1) column so a
+single baseline_price_vec call prices C candidates x D historical days at once.
+Cities are spread across a process pool; workers never touch the ORM.
+
+History is city-level market data with no per-room-count prices, so candidates
+are scored as a 1-room listing against the market. room_uplift cannot be learned
+from that target and is not searched: winners keep DEFAULT_PARAMS' value.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+
+from apps.listings.models import Listing
+from .backtest import load_city_history
+from .models import PricingParams
+from .pricing import DEFAULT_PARAMS, baseline_price_vec, clear_params_cache
+
+# (low, high) bounds searched for each coefficient (room_uplift is fixed, see above)
+SEARCH_SPACE: Dict[str, Tuple[float, float]] = {
+    "occ_pivot": (50.0, 80.0),
+    "occ_divisor": (150.0, 600.0),
+    "weekend_uplift": (1.0, 1.30),
+    "event_divisor": (20.0, 100.0),
+    "floor": (500.0, 1500.0),
+    "cap_mult": (1.5, 3.0),
+}
+
+OBJECTIVES = ("revenue", "mape")
+BLOCK = 256  # candidates priced per vectorized call
+
+
+def grid_candidates(steps: int = 3) -> Dict[str, np.ndarray]:
+    axes = [np.linspace(lo, hi, max(1, steps)) for lo, hi in SEARCH_SPACE.values()]
+    grid = np.array(list(itertools.product(*axes)), dtype=np.float64)
+    return {k: grid[:, i] for i, k in enumerate(SEARCH_SPACE)}
+
+
+def random_candidates(n: int = 2000, seed: int = 0) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return {k: rng.uniform(lo, hi, size=n) for k, (lo, hi) in SEARCH_SPACE.items()}
+
+
+def _with_defaults(cands: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    # Row 0 is always DEFAULT_PARAMS (searched keys only) so every city reports a comparable default score.
+    return {k: np.concatenate(([DEFAULT_PARAMS[k]], v)) for k, v in cands.items() if k in SEARCH_SPACE}
+
+
+def _scores(prices: np.ndarray, mp: np.ndarray, occ: np.ndarray, objective: str, elasticity: float) -> np.ndarray:
+    """
+    prices: (C, D). Higher is better for every objective (MAPE is negated).
+    Same revenue proxy as backtest.evaluate, reduced along the day axis.
+    """
+    if objective == "mape":
+        return -np.mean(np.abs(prices - mp) / mp, axis=-1) * 100.0
+    exp_occ = np.clip(occ * (mp / prices) ** elasticity, 0.0, 1.0)
+    return np.sum(prices * exp_occ, axis=-1)
+
+
+def _tune_city(job: dict) -> dict:
+    h = job["history"]
+    cands = job["candidates"]
+    n_cand = len(cands["floor"])
+    scores = np.zeros(n_cand, dtype=np.float64)
+    occ = h["occ"] / 100.0
+
+    # rooms=1: the market price is the only target we have (see module docstring).
+    for lo in range(0, n_cand, BLOCK):
+        block = {k: v[lo:lo + BLOCK, None] for k, v in cands.items()}
+        prices = baseline_price_vec(1, h["price"], h["occ"], h["event_score"], h["dow"], block)
+        scores[lo:lo + BLOCK] = _scores(prices, h["price"], occ, job["objective"], job["elasticity"])
+
+    best = int(np.argmax(scores))
+    params = {k: float(v[best]) for k, v in cands.items()}
+    params["room_uplift"] = DEFAULT_PARAMS["room_uplift"]
+    return {
+        "city": job["city"],
+        "params": params,
+        "score": float(scores[best]),
+        "default_score": float(scores[0]),
+        "n_days": int(len(h["dt"])),
+    }
+
+
+def tune(cities: Optional[Iterable[str]] = None, method: str = "random", samples: int = 2000,
+         steps: int = 3, seed: int = 0, objective: str = "revenue", elasticity: float = 1.5,
+         start: Optional[date] = None, end: Optional[date] = None,
+         workers: Optional[int] = None, save: bool = True) -> List[dict]:
+    """
+    Search SEARCH_SPACE per city and (optionally) persist the winners to PricingParams.
+    room_uplift is not searched; saved rows always carry the default.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    if method == "grid":
+        cands = grid_candidates(steps)
+    elif method == "random":
+        cands = random_candidates(samples, seed)
+    else:
+        raise ValueError("method must be 'grid' or 'random'")
+    cands = _with_defaults(cands)
+
+    if cities is None:
+        cities = Listing.objects.values_list("city", flat=True).distinct()
+    jobs = []
+    for city in sorted(set(cities)):
+        history = load_city_history(city, start, end)
+        if not len(history["dt"]):
+            continue
+        jobs.append({
+            "city": city,
+            "history": history,
+            "candidates": cands,
+            "objective": objective,
+            "elasticity": float(elasticity),
+        })
+
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        results = [_tune_city(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_tune_city, jobs))
+
+    if save:
+        with transaction.atomic():
+            for res in results:
+                PricingParams.objects.update_or_create(
+                    city=res["city"],
+                    defaults=dict(
+                        params=res["params"],
+                        objective=objective,
+                        score=res["score"],
+                        default_score=res["default_score"],
+                        n_days=res["n_days"],
+                    ),
+                )
+        clear_params_cache()
+    return results
@@ -1,19 +1,24 @@
 from datetime import date, timedelta
+from django.db.models import OuterRef, Subquery
 from django.utils.dateparse import parse_date
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework import status
 
-from apps.listings.models import Listing
+from apps.common.profiling import phase, profiled
+from apps.listings.models import Listing, Override
+from apps.recommendations.access import record_access
 from apps.recommendations.models import Recommendation
-from apps.recommendations.tasks import generate_recommendations_for_listing
+from apps.recommendations.tasks import blocked_days, generate_recommendations_for_listing
 
 
+@profiled("listing_recommendations")
 @api_view(["GET"])
 def listing_recommendations(request, listing_id):
     # Validate listing exists (return 404 early if not)
     try:
-        listing = Listing.objects.only("id").get(id=listing_id)
+        with phase("lookup"):
+            listing = Listing.objects.only("id").get(id=listing_id)
     except Listing.DoesNotExist:
         return Response({"detail": "Listing not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -23,26 +28,43 @@ def listing_recommendations(request, listing_id):
     if end < start:
         start, end = end, start
 
-    expected_days = (end - start).days + 1
+    record_access(listing.id, start, end)
 
-    # See what we already have
-    qs = Recommendation.objects.filter(listing_id=listing.id, dt__range=(start, end)).order_by("dt")
-    have = qs.count()
+    # Blocked days are never priced, so they don't count as missing and aren't returned.
+    with phase("lookup"):
+        blocked = blocked_days(listing.id, start, end)
+    expected_days = (end - start).days + 1 - len(blocked)
+
+    # Manual overrides ride along on the same (listing_id, dt)-indexed query.
+    manual = Override.objects.filter(listing_id=OuterRef("listing_id"), dt=OuterRef("dt")).values("manual_price")[:1]
+    qs = (
+        Recommendation.objects.filter(listing_id=listing.id, dt__range=(start, end))
+        .exclude(dt__in=blocked)
+        .annotate(manual_price=Subquery(manual))
+        .order_by("dt")
+    )
+    with phase("count"):
+        recs = list(qs)
 
     # If any day is missing in the requested window, generate JUST this window for THIS listing
-    if have < expected_days:
-        generate_recommendations_for_listing.run(str(listing.id), start.isoformat(), end.isoformat(), replace=True)
-        qs = Recommendation.objects.filter(listing_id=listing.id, dt__range=(start, end)).order_by("dt")
+    if len(recs) < expected_days:
+        with phase("generation"):
+            generate_recommendations_for_listing.run(str(listing.id), start.isoformat(), end.isoformat(), replace=True)
+        with phase("refetch"):
+            recs = list(qs.all())
 
     # Inline serialization (simple & fast)
-    data = [
-        {
-            "dt": r.dt.isoformat(),
-            "rec_price": float(r.rec_price),
-            "conf_low": float(r.conf_low),
-            "conf_high": float(r.conf_high),
-            "reason": r.reason,
-        }
-        for r in qs
-    ]
+    with phase("serialization"):
+        data = [
+            {
+                "dt": r.dt.isoformat(),
+                "rec_price": float(r.rec_price),
+                "conf_low": float(r.conf_low),
+                "conf_high": float(r.conf_high),
+                "reason": r.reason,
+                "manual_price": None if r.manual_price is None else float(r.manual_price),
+                "final_price": float(r.rec_price if r.manual_price is None else r.manual_price),
+            }
+            for r in recs
+        ]
     return Response(data)
@@ -47,6 +47,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Load/soak runs: per-process request & SQL counters at /api/metrics/ (tools/loadtest.py)
+LOAD_METRICS = env.bool("LOAD_METRICS", default=False)
+if LOAD_METRICS:
+    MIDDLEWARE.insert(0, "apps.common.metrics.QueryMetricsMiddleware")
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -102,19 +107,92 @@ REST_FRAMEWORK = {
 CORS_ALLOWED_ORIGINS = env.list("CORS_ALLOWED_ORIGINS")
 CORS_ALLOW_CREDENTIALS = True
 
+REDIS_URL = env("REDIS_URL")
+
+# Shared across web/Celery processes (Expedia response cache, ...)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "OPTIONS": {"socket_connect_timeout": 0.5},
+    }
+}
+
 CELERY_BROKER_URL = env("REDIS_URL")
 CELERY_RESULT_BACKEND = env("REDIS_URL")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline (no broker/worker); handy for single-process load runs
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", default=False)
+
+# Opt-in profiling (apps/common/profiling.py): cProfile + SQL + phase timings written to
+# PROFILE_DIR for everything, a random sample, or requests sending "X-Profile: <PROFILE_TOKEN>"
+PROFILE_ENABLED = env.bool("PROFILE_ENABLED", default=False)
+PROFILE_SAMPLE_RATE = env.float("PROFILE_SAMPLE_RATE", default=0.0)
+PROFILE_TOKEN = env("PROFILE_TOKEN", default="")
+PROFILE_DIR = env("PROFILE_DIR", default=str(BASE_DIR / "profiles"))
+PROFILE_TASK_PREFIXES = ("apps.recommendations.", "apps.llmcore.")
+
+# Priority lanes: user-facing generation ("interactive") never queues behind fleet-wide
+# jobs ("batch", also the default for anything unrouted). Run one worker per lane
+# (`-Q interactive` / `-Q batch`) or one worker with `-Q interactive,batch`.
+CELERY_LANES = ("interactive", "batch")
+CELERY_TASK_DEFAULT_QUEUE = "batch"
+CELERY_TASK_ROUTES = {
+    "apps.llmcore.tasks.llm_generate_for_range": {"queue": "interactive"},
+    "apps.llmcore.tasks.llm_hybrid_generate_for_range": {"queue": "interactive"},
+    "apps.recommendations.tasks.generate_recommendations_for_listing": {"queue": "interactive"},
+    "apps.common.views._ping": {"queue": "interactive"},
+}
+# Reserve one message per worker process so a busy batch worker doesn't hoard the queue
+CELERY_WORKER_PREFETCH_MULTIPLIER = env.int("CELERY_WORKER_PREFETCH_MULTIPLIER", default=1)
+# Fleet-wide jobs fan out one batch task per this many listings (0 = a single long task)
+BATCH_CHUNK_SIZE = env.int("BATCH_CHUNK_SIZE", default=20)
+# Queue-wait samples kept per lane for /api/lanes/
+LANE_WAIT_SAMPLES = env.int("LANE_WAIT_SAMPLES", default=1000)
+
+# Rolling precompute: every listing keeps RECS_WARM_HORIZON_DAYS ready; listings users
+# actually request (tracked in Redis) are warmed further ahead and more often.
+RECS_WARM_HORIZON_DAYS = env.int("RECS_WARM_HORIZON_DAYS", default=180)
+RECS_HOT_HORIZON_DAYS = env.int("RECS_HOT_HORIZON_DAYS", default=365)
+RECS_HOT_TOP_N = env.int("RECS_HOT_TOP_N", default=50)
+RECS_MAX_HORIZON_DAYS = env.int("RECS_MAX_HORIZON_DAYS", default=730)
+
 CELERY_BEAT_SCHEDULE = {
     "gen-recs-daily": {
         "task": "apps.recommendations.tasks.generate_recommendations",
         "schedule": timedelta(hours=24),
-        "args": (30,),
-    }
+        "args": (RECS_WARM_HORIZON_DAYS,),
+    },
+    "warm-hot-recs": {
+        "task": "apps.recommendations.tasks.warm_hot_listings",
+        "schedule": timedelta(hours=1),
+    },
 }
+# Seconds each process caches tuned PricingParams before re-reading them
+PRICING_PARAMS_CACHE_S = env.int("PRICING_PARAMS_CACHE_S", default=300)
+
+# Per-worker city market cache (apps.recommendations.market_cache)
+MARKET_CACHE_MAX_ENTRIES = env.int("MARKET_CACHE_MAX_ENTRIES", default=64)
+MARKET_CACHE_TTL_S = env.int("MARKET_CACHE_TTL_S", default=900)
+MARKET_CACHE_PUBSUB = env.bool("MARKET_CACHE_PUBSUB", default=True)  # cross-worker invalidation via Redis
+
+# Hybrid LLM pricing (apps.llmcore.price.generate_hybrid_prices_range)
+LLM_DEADLINE_S = env.float("LLM_DEADLINE_S", default=8.0)          # per HTTP call
+LLM_HEDGE_AFTER_S = env.float("LLM_HEDGE_AFTER_S", default=3.0)    # duplicate a call slower than this
+LLM_RANGE_BUDGET_S = env.float("LLM_RANGE_BUDGET_S", default=20.0) # max wait for a whole range
+LLM_CONCURRENCY = env.int("LLM_CONCURRENCY", default=8)
+# Comps index (apps.llmcore.comps): neighbours per prompt and full re-read interval
+COMPS_K = env.int("COMPS_K", default=5)
+COMPS_REFRESH_S = env.int("COMPS_REFRESH_S", default=600)
+# City-level mode: days priced per LLM call (one call per city per chunk)
+LLM_CITY_CHUNK_DAYS = env.int("LLM_CITY_CHUNK_DAYS", default=30)
+# ... and each such call's HTTP deadline and retries (a 30-day JSON answer is slow to generate)
+LLM_CITY_DEADLINE_S = env.float("LLM_CITY_DEADLINE_S", default=90.0)
+LLM_CITY_RETRIES = env.int("LLM_CITY_RETRIES", default=2)
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
 LOGGING = {
@@ -122,6 +200,7 @@ LOGGING = {
     "disable_existing_loggers": False,
     "handlers": {"console": {"class": "logging.StreamHandler"}},
     "root": {"handlers": ["console"], "level": "INFO"},
+    "loggers": {"httpx": {"level": "WARNING"}},  # one INFO line per collector request otherwise
 }
 
 EXPEDIA_GRAPHQL_URL = os.getenv("EXPEDIA_GRAPHQL_URL", "https://www.expedia.co.in/graphql")
@@ -135,4 +214,7 @@ EXPEDIA_PERSISTED_HASH = os.getenv("EXPEDIA_PERSISTED_HASH", "835f02981ed875d25c
 EXPEDIA_REGION_ID = os.getenv("EXPEDIA_REGION_ID", "178293")
 EXPEDIA_LAT = os.getenv("EXPEDIA_LAT", "40.75668")
 EXPEDIA_LON = os.getenv("EXPEDIA_LON", "-73.98647")
-EXPEDIA_RATE_DELAY_S = os.getenv("EXPEDIA_RATE_DELAY_S", "1.0")
\ No newline at end of file
+EXPEDIA_RATE_DELAY_S = os.getenv("EXPEDIA_RATE_DELAY_S", "1.0")
+EXPEDIA_MAX_CONNECTIONS = int(os.getenv("EXPEDIA_MAX_CONNECTIONS", "8"))
+EXPEDIA_TIMEOUT_S = float(os.getenv("EXPEDIA_TIMEOUT_S", "15"))
+EXPEDIA_CACHE_S = int(os.getenv("EXPEDIA_CACHE_S", str(6 * 3600)))  # per (region, date) response cache
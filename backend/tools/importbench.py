@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Cold-start benchmark for web and Celery processes.
+
+Each sample is a fresh interpreter that boots a profile and reports wall time,
+peak RSS and whether the openai SDK got imported:
+  web     django.setup() + the URLconf (pulls in every view -> llmcore.tasks -> price)
+  celery  the Celery app + every autodiscovered tasks module (what a worker loads before its first task)
+
+"lazy" is the tree as is (LLM providers import on first use). "eager" imports
+the openai SDK up front, i.e. what every process paid before the provider
+registry, so eager - lazy is the saving.
+
+    cd backend
+    python tools/importbench.py --runs 7
+    python tools/importbench.py --top 15     # heaviest imports of the lazy web boot (-X importtime)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+BOOT = {
+    "web": (
+        "import django; django.setup()\n"
+        "from django.urls import get_resolver; get_resolver().url_patterns\n"
+    ),
+    "celery": (
+        "from config.celery import app; app.loader.import_default_modules()\n"
+    ),
+}
+
+PROBE = """
+import os, resource, sys, time
+t0 = time.perf_counter()
+{eager}{boot}
+print(__import__("json").dumps({{
+    "s": time.perf_counter() - t0,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "openai": "openai" in sys.modules,
+}}))
+"""
+
+
+def _env():
+    return dict(os.environ, DJANGO_SETTINGS_MODULE="config.settings", PYTHONPATH=str(BACKEND_DIR))
+
+
+def sample(profile: str, eager: bool) -> dict:
+    code = PROBE.format(eager="import openai\n" if eager else "", boot=BOOT[profile])
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def top_imports(profile: str, n: int) -> None:
+    code = PROBE.format(eager="", boot=BOOT[profile])
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, env=_env(),
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cum_us), int(self_us), name.rstrip()))
+    print(f"\nheaviest imports ({profile}, cumulative):")
+    for cum, own, name in sorted(rows, reverse=True)[:n]:
+        print(f"  {cum / 1000:8.1f} ms  (self {own / 1000:6.1f})  {name}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5, help="Fresh interpreters per profile/variant (median is reported)")
+    ap.add_argument("--profile", choices=sorted(BOOT), action="append", help="Default: all")
+    ap.add_argument("--top", type=int, default=0, help="Also list the N heaviest imports of each lazy boot")
+    args = ap.parse_args()
+
+    for profile in args.profile or sorted(BOOT, reverse=True):
+        res = {}
+        for variant in ("eager", "lazy"):
+            runs = [sample(profile, variant == "eager") for _ in range(args.runs)]
+            res[variant] = {
+                "s": statistics.median(r["s"] for r in runs),
+                "rss_mb": statistics.median(r["rss_kb"] for r in runs) / 1024,
+                "openai": runs[0]["openai"],
+            }
+            print(f"{profile:<7} {variant:<6} boot={res[variant]['s'] * 1000:7.1f} ms  "
+                  f"peak_rss={res[variant]['rss_mb']:6.1f} MB  openai_loaded={res[variant]['openai']}")
+        print(f"{profile:<7} saving {(res['eager']['s'] - res['lazy']['s']) * 1000:7.1f} ms  "
+              f"{res['eager']['rss_mb'] - res['lazy']['rss_mb']:6.1f} MB per process")
+        if args.top:
+            top_imports(profile, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+"""
+End-to-end load / soak harness replaying frontend traffic against the backend.
+
+Virtual users loop over a weighted mix of what the UI does:
+  browse  GET  /api/listings/ (+ one listing detail)
+  recs    GET  /api/listings/<id>/recommendations/?from&to  (window slides forward per user)
+  quote   POST /api/llm/quote/  (a burst of 2-5 hybrid quotes)
+
+Every --interval seconds it prints per-endpoint latency percentiles and error
+rates, the SQL query rate (from /api/metrics/, needs LOAD_METRICS=1 on the web
+and Celery processes; worker queries reach it through Redis) and the resident
+memory of the watched process trees. The final summary flags memory growth over
+the run (soak mode). Watched trees are the ones --start-server starts, plus any
+--pid; against --base-url alone there is nothing to watch, so --soak needs --pid.
+
+    # start gunicorn (+ optional celery worker) with a stubbed LLM, then load it
+    python tools/loadtest.py --start-server --users 20 --duration 120
+    python tools/loadtest.py --start-server --celery --soak --duration 3600 --interval 60
+    # or point it at something already running (start that with LOAD_METRICS=1 LLM_PROVIDER=stub)
+    python tools/loadtest.py --base-url http://localhost:8000/api --users 50
+    python tools/loadtest.py --base-url http://localhost:8000/api --soak \
+        --pid web=$(cat gunicorn.pid) --pid celery=$(cat celery.pid)
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+THINK_TIME_S = 0.2  # mean pause between a virtual user's actions
+
+
+# ---- process helpers --------------------------------------------------------
+
+def _children(pid):
+    out = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            out.append(int(stat.parent.name))
+    return out
+
+
+def tree_rss_kb(pid):
+    """Resident memory of a process and all its descendants (gunicorn/celery prefork)."""
+    total, todo = 0, [pid]
+    while todo:
+        p = todo.pop()
+        try:
+            for line in Path(f"/proc/{p}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+        except OSError:
+            continue
+        todo.extend(_children(p))
+    return total
+
+
+def start_processes(args):
+    env = dict(
+        os.environ,
+        LOAD_METRICS="1",
+        LLM_PROVIDER="stub",
+        LLM_STUB_LATENCY_S=str(args.llm_latency),
+        CELERY_TASK_ALWAYS_EAGER="0" if args.celery else "1",
+    )
+    procs = {}
+    procs["web"] = subprocess.Popen(
+        ["gunicorn", "config.wsgi:application", "--bind", f"127.0.0.1:{args.port}",
+         "--workers", str(args.web_workers), "--timeout", "90"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    if args.celery:
+        procs["celery"] = subprocess.Popen(
+            ["celery", "-A", "config", "worker", "-l", "warning", "-Q", "interactive,batch",
+             "--concurrency", str(args.celery_concurrency)],
+            cwd=BACKEND_DIR, env=env,
+        )
+    base = f"http://127.0.0.1:{args.port}/api"
+    for _ in range(100):
+        try:
+            if requests.get(f"{base}/health/", timeout=1).ok:
+                return procs, base
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_processes(procs)
+    sys.exit("backend did not become healthy")
+
+
+def stop_processes(procs):
+    for p in procs.values():
+        p.send_signal(signal.SIGTERM)
+    for p in procs.values():
+        try:
+            p.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+# ---- stats ------------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.window = defaultdict(list)   # endpoint -> [(latency_s, ok)]
+        self.total = defaultdict(list)
+
+    def add(self, endpoint, latency, ok):
+        with self.lock:
+            self.window[endpoint].append((latency, ok))
+            self.total[endpoint].append((latency, ok))
+
+    def take_window(self):
+        with self.lock:
+            w, self.window = self.window, defaultdict(list)
+        return w
+
+
+def pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100.0 * len(values)))]
+
+
+def summarize(samples, seconds):
+    out = {}
+    for ep, rows in sorted(samples.items()):
+        lat = [r[0] * 1000 for r in rows]
+        errors = sum(1 for r in rows if not r[1])
+        out[ep] = {
+            "n": len(rows),
+            "rps": round(len(rows) / seconds, 2) if seconds else 0.0,
+            "p50_ms": round(pct(lat, 50), 1),
+            "p95_ms": round(pct(lat, 95), 1),
+            "p99_ms": round(pct(lat, 99), 1),
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+        }
+    return out
+
+
+# ---- virtual user -------------------------------------------------------------
+
+def virtual_user(base, stats, stop, mix, rng):
+    s = requests.Session()
+    listing_ids = []
+    offset = rng.randint(0, 30)
+    names, weights = zip(*mix.items())
+
+    def call(endpoint, method, url, **kw):
+        t0 = time.perf_counter()
+        try:
+            r = s.request(method, url, timeout=60, **kw)
+            ok = r.status_code < 400
+        except requests.RequestException:
+            r, ok = None, False
+        stats.add(endpoint, time.perf_counter() - t0, ok)
+        return r
+
+    while not stop.is_set():
+        action = rng.choices(names, weights)[0]
+        if action == "browse" or not listing_ids:
+            r = call("GET /listings/", "GET", f"{base}/listings/")
+            if r is not None and r.ok:
+                listing_ids = [x["id"] for x in r.json()] or listing_ids
+            if listing_ids:
+                call("GET /listings/:id/", "GET", f"{base}/listings/{rng.choice(listing_ids)}/")
+        elif action == "recs":
+            # The calendar view: a 14-30 day window that slides forward as the user pages.
+            start = date.today() + timedelta(days=offset)
+            end = start + timedelta(days=rng.randint(14, 30))
+            offset = (offset + rng.choice((7, 14, 30))) % 365
+            call("GET /listings/:id/recommendations/", "GET",
+                 f"{base}/listings/{rng.choice(listing_ids)}/recommendations/",
+                 params={"from": start.isoformat(), "to": end.isoformat()})
+        elif action == "quote":
+            for _ in range(rng.randint(2, 5)):
+                start = date.today() + timedelta(days=rng.randint(0, 60))
+                call("POST /llm/quote/", "POST", f"{base}/llm/quote/", json={
+                    "listing_id": rng.choice(listing_ids),
+                    "start": start.isoformat(),
+                    "end": (start + timedelta(days=6)).isoformat(),
+                    "mode": "hybrid",
+                })
+        stop.wait(rng.uniform(0, 2 * THINK_TIME_S))
+
+
+# ---- main -------------------------------------------------------------------
+
+def poll_metrics(base, per_pid):
+    """
+    Total SQL queries so far: web workers (latest /api/metrics/ snapshot per pid,
+    a few polls to reach several workers) plus Celery workers (one shared counter).
+    """
+    worker = 0
+    for _ in range(6):
+        try:
+            m = requests.get(f"{base}/metrics/", timeout=2).json()
+            per_pid[m["pid"]] = m
+        except (requests.RequestException, ValueError, KeyError):
+            return
+        worker = m.get("worker_queries") or worker
+    return sum(m["queries"] for m in per_pid.values()) + worker
+
+
+def parse_pids(specs):
+    watch = {}
+    for spec in specs:
+        name, _, pid = spec.rpartition("=")
+        if not pid.isdigit():
+            raise ValueError(spec)
+        watch[name or pid] = int(pid)
+    return watch
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", help="API base (e.g. http://localhost:8000/api); skips --start-server")
+    ap.add_argument("--start-server", action="store_true", help="Start gunicorn with a stubbed LLM")
+    ap.add_argument("--celery", action="store_true", help="Also start a Celery worker (else tasks run eagerly)")
+    ap.add_argument("--port", type=int, default=8055)
+    ap.add_argument("--web-workers", type=int, default=3)
+    ap.add_argument("--celery-concurrency", type=int, default=4)
+    ap.add_argument("--llm-latency", type=float, default=0.3, help="Stub LLM latency per call (s)")
+    ap.add_argument("--users", type=int, default=10)
+    ap.add_argument("--duration", type=float, default=60.0)
+    ap.add_argument("--interval", type=float, default=10.0)
+    ap.add_argument("--mix", default="browse=3,recs=10,quote=1", help="Weighted action mix")
+    ap.add_argument("--pid", action="append", default=[], metavar="NAME=PID",
+                    help="Also watch this process tree's memory (repeatable; e.g. web=<gunicorn master pid>)")
+    ap.add_argument("--soak", action="store_true", help="Fail if memory grows more than --max-growth")
+    ap.add_argument("--max-growth", type=float, default=0.25, help="Allowed RSS growth over the run (fraction)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="Write the full report to this file")
+    args = ap.parse_args()
+
+    mix = {k: float(v) for k, v in (part.split("=") for part in args.mix.split(","))}
+    try:
+        extra_pids = parse_pids(args.pid)
+    except ValueError as e:
+        ap.error(f"--pid expects NAME=PID, got {e}")
+    if args.soak and args.base_url and not extra_pids:
+        ap.error("--soak against --base-url needs --pid to watch memory (or use --start-server)")
+    procs = {}
+    if args.base_url:
+        base = args.base_url.rstrip("/")
+    elif args.start_server:
+        procs, base = start_processes(args)
+    else:
+        ap.error("pass --base-url or --start-server")
+    watch = {**{name: p.pid for name, p in procs.items()}, **extra_pids}
+
+    stats, stop = Stats(), threading.Event()
+    users = [
+        threading.Thread(target=virtual_user, args=(base, stats, stop, mix, random.Random(args.seed + i)), daemon=True)
+        for i in range(args.users)
+    ]
+    report = {"intervals": [], "config": vars(args)}
+    per_pid = {}
+    last_q = poll_metrics(base, per_pid)
+    t_start = last_t = time.time()
+    try:
+        for u in users:
+            u.start()
+        while time.time() - t_start < args.duration:
+            time.sleep(min(args.interval, max(0.0, args.duration - (time.time() - t_start))))
+            now = time.time()
+            window = summarize(stats.take_window(), now - last_t)
+            q = poll_metrics(base, per_pid)
+            qps = round((q - last_q) / (now - last_t), 1) if q is not None and last_q is not None else None
+            mem = {name: tree_rss_kb(pid) // 1024 for name, pid in watch.items()}
+            report["intervals"].append({"t": round(now - t_start, 1), "endpoints": window, "db_qps": qps, "rss_mb": mem})
+            last_q, last_t = q, now
+
+            print(f"[{now - t_start:7.1f}s] db_qps={qps} rss_mb={mem}")
+            for ep, m in window.items():
+                print(f"    {ep:<38} n={m['n']:<6} rps={m['rps']:<7} p50={m['p50_ms']:<8} "
+                      f"p95={m['p95_ms']:<8} p99={m['p99_ms']:<8} err={m['error_rate']:.2%}")
+    finally:
+        stop.set()
+        for u in users:
+            u.join(timeout=65)
+        if procs:
+            stop_processes(procs)
+
+    elapsed = time.time() - t_start
+    report["summary"] = summarize(stats.total, elapsed)
+    growth = {}
+    if len(report["intervals"]) >= 2:
+        for name in watch:
+            series = [i["rss_mb"][name] for i in report["intervals"] if i["rss_mb"].get(name)]
+            if len(series) >= 2 and series[0]:
+                growth[name] = round(series[-1] / series[0] - 1.0, 3)
+    report["rss_growth"] = growth
+
+    print("\n== summary ({:.0f}s, {} users) ==".format(elapsed, args.users))
+    for ep, m in report["summary"].items():
+        print(f"  {ep:<38} n={m['n']:<7} rps={m['rps']:<7} p50={m['p50_ms']:<8} "
+              f"p95={m['p95_ms']:<8} p99={m['p99_ms']:<8} err={m['error_rate']:.2%}")
+    if growth:
+        print(f"  rss growth: {growth}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+    if args.soak and any(g > args.max_growth for g in growth.values()):
+        sys.exit(f"memory grew more than {args.max_growth:.0%}: {growth}")
+
+
+if __name__ == "__main__":
+    main()
@@ -57,6 +57,8 @@ export type Recommendation = {
   conf_low: number;
   conf_high: number;
   reason: string;
+  manual_price: number | null; // host override for the day, if any
+  final_price: number; // manual_price ?? rec_price
 };
 
 // ===== API =====